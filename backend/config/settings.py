@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -127,14 +128,38 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
+    # The browsable API is a development aid; keep it out of content negotiation in production
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ),
+        'store.renderers.FastJSONRenderer',
+    ) + (('rest_framework.renderers.BrowsableAPIRenderer',) if DEBUG else ()),
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
     'DATETIME_FORMAT': '%Y-%m-%d %H:%M:%S',
 }
 
+# Maximum number of queries a read request may issue before failing.
+# Meant for test runs (e.g. STORE_QUERY_BUDGET=10) to catch missing prefetches.
+STORE_QUERY_BUDGET = int(os.getenv('STORE_QUERY_BUDGET', 0)) or None
+
+# PostgreSQL text search configurations used for the product catalog
+STORE_SEARCH_CONFIGS = ('russian', 'english')
+
+# Build hot read payloads (order lists, product cards) from .values() rows instead
+# of nested ModelSerializers. Disable to fall back to the DRF serializers.
+STORE_COMPILED_SERIALIZERS = os.getenv('STORE_COMPILED_SERIALIZERS', 'True') == 'True'
+
+# Resized copies generated for every product image: name -> bounding box.
+# Formats the installed Pillow can't encode (e.g. AVIF without the plugin) are skipped.
+STORE_IMAGE_DERIVATIVES = {
+    'thumbnail': (200, 200),
+    'medium': (600, 600),
+    'large': (1200, 1200),
+}
+STORE_IMAGE_FORMATS = ('avif', 'webp')
+STORE_IMAGE_WORKERS = int(os.getenv('STORE_IMAGE_WORKERS', 2))
+# Image files stored or reused more recently than this (seconds) are never deleted:
+# an upload may still be about to create the row referencing them.
+STORE_IMAGE_RELEASE_GRACE = int(os.getenv('STORE_IMAGE_RELEASE_GRACE', 60 * 60))
+
 # drf-spectacular settings
 SPECTACULAR_SETTINGS = {
     'TITLE': 'E-commerce API',
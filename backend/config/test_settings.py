@@ -0,0 +1,34 @@
+"""
+Settings for the test suite: the regular settings with a local cache and the
+query budget switched on.
+
+The suite needs a PostgreSQL server with the contrib extensions installed:
+the catalog relies on full-text search, pg_trgm indexes and COPY, none of which
+other backends provide. Point it at one with the usual ``DB_*`` variables; the
+defaults match a local server (``localhost:5432``, user ``postgres``). The
+connecting role must be allowed to create the ``test_<DB_NAME>`` database
+and the pg_trgm extension in it.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+
+SECRET_KEY = SECRET_KEY or 'test'  # noqa: F405
+
+DATABASES['default'].update({  # noqa: F405
+    'NAME': os.getenv('DB_NAME') or 'gorbachev_shop',
+    'USER': os.getenv('DB_USER') or 'postgres',
+    'HOST': os.getenv('DB_HOST') or 'localhost',
+    'PORT': os.getenv('DB_PORT') or '5432',
+    'CONN_MAX_AGE': 0,
+})
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Read requests issuing more queries than this fail with QueryBudgetExceeded,
+# so a missing prefetch breaks the tests instead of adding silent N+1 queries
+STORE_QUERY_BUDGET = 15
@@ -45,6 +45,8 @@ class CartAdmin(ExportMixin, ActivationMixin, TimestampedAdminMixin, admin.Model
     inlines = [CartItemInline]
     readonly_fields = [
         'total_amount',
+        'total_items',
+        'item_count',
         'created_at',
         'updated_at'
     ]
@@ -57,7 +59,7 @@ class CartAdmin(ExportMixin, ActivationMixin, TimestampedAdminMixin, admin.Model
 
     fieldsets = (
         (None, {
-            'fields': ('user', 'total_amount')
+            'fields': ('user', 'total_amount', 'total_items', 'item_count')
         }),
         (_('Status and Timestamps'), {
             'fields': ('is_active', 'created_at', 'updated_at'),
@@ -65,10 +67,6 @@ class CartAdmin(ExportMixin, ActivationMixin, TimestampedAdminMixin, admin.Model
         }),
     )
 
-    def item_count(self, obj):
-        return obj.items.count()
-    item_count.short_description = _('Items')
-
     def clear_carts(self, request, queryset):
         """Clear all items from selected carts."""
         for cart in queryset:
@@ -12,6 +12,8 @@ class CategoryAdmin(ExportMixin, ActivationMixin, TimestampedAdminMixin, admin.M
         'parent',
         'is_active',
         'product_count',
+        'subtree_product_count',
+        'variant_count',
         'created_at',
     ]
     list_filter = [
@@ -28,6 +30,8 @@ class CategoryAdmin(ExportMixin, ActivationMixin, TimestampedAdminMixin, admin.M
         'slug': ('name',)
     }
     ordering = ['name']
+    # __str__ shows the parent's name
+    list_select_related = ['parent']
     actions = [
         'activate_items',
         'deactivate_items',
@@ -38,16 +42,16 @@ class CategoryAdmin(ExportMixin, ActivationMixin, TimestampedAdminMixin, admin.M
         (None, {
             'fields': ('name', 'slug', 'parent', 'description')
         }),
+        (_('Counters'), {
+            'fields': Category.COUNTER_FIELDS,
+            'classes': ('collapse',)
+        }),
         (_('Status and Timestamps'), {
             'fields': ('is_active', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
-
-    def product_count(self, obj):
-        """Get the number of products in this category."""
-        return obj.products.count()
-    product_count.short_description = _('Products')
+    readonly_fields = Category.COUNTER_FIELDS
 
     def get_export_fields(self):
         """Specify fields for CSV export."""
@@ -58,6 +62,9 @@ class CategoryAdmin(ExportMixin, ActivationMixin, TimestampedAdminMixin, admin.M
             'description',
             'is_active',
             'product_count',
+            'subtree_product_count',
+            'variant_count',
+            'subtree_variant_count',
             'created_at',
         ]
 
@@ -72,11 +79,11 @@ class CategoryAdmin(ExportMixin, ActivationMixin, TimestampedAdminMixin, admin.M
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         """Customize parent category choices to prevent self-reference."""
         if db_field.name == "parent":
-            if request._obj is not None:
+            kwargs["queryset"] = Category.objects.select_related('parent')
+            if request._obj is not None and request._obj.path:
                 # Exclude self and descendants from parent choices
-                kwargs["queryset"] = Category.objects.exclude(
-                    pk__in=[request._obj.pk] + 
-                           [c.pk for c in request._obj.get_descendants()]
+                kwargs["queryset"] = kwargs["queryset"].exclude(
+                    path__startswith=request._obj.path
                 )
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
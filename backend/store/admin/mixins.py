@@ -6,6 +6,8 @@ from django.utils.html import format_html
 import csv
 import json
 
+from ..signals import notify_bulk_update
+
 class ExportMixin:
     """Mixin to add CSV export functionality to admin classes."""
     def get_export_fields(self):
@@ -42,12 +44,16 @@ class ExportMixin:
 class ActivationMixin:
     """Mixin to add activation/deactivation functionality."""
     def activate_items(self, request, queryset):
+        pks = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_active=True)
+        notify_bulk_update(self.model, pks)
         self.message_user(request, _(f'{updated} items were successfully activated.'))
     activate_items.short_description = _("Activate selected items")
 
     def deactivate_items(self, request, queryset):
+        pks = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_active=False)
+        notify_bulk_update(self.model, pks)
         self.message_user(request, _(f'{updated} items were successfully deactivated.'))
     deactivate_items.short_description = _("Deactivate selected items")
 
@@ -65,7 +71,7 @@ class ImagePreviewMixin:
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-height: 50px; max-width: 100px;"/>',
-                obj.image.url
+                obj.get_derivative_url('thumbnail')
             )
         return _("No image")
     image_preview.short_description = _("Preview")
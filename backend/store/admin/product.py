@@ -1,17 +1,24 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
+from django.db import transaction
 from django.db.models import Q, Count, Sum
-from django.urls import reverse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.urls import path, reverse
 from django.utils.safestring import mark_safe
 
 from ..models import (
+    Category,
     Product,
     ProductVariant,
     ProductImage,
     ProductAttribute,
     StockHistory
 )
+from ..importers import CatalogImporter, RowError, write_template
+from ..exporters import CatalogExporter, EXPORT_FORMATS
 from .mixins import (
     ExportMixin,
     ActivationMixin,
@@ -20,6 +27,9 @@ from .mixins import (
     StockManagementMixin
 )
 
+IMPORT_ERRORS_SHOWN = 100
+
+
 class ProductVariantInline(admin.TabularInline):
     model = ProductVariant
     extra = 1
@@ -49,7 +59,7 @@ class ProductImageInline(admin.TabularInline):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-height: 50px;"/>',
-                obj.image.url
+                obj.get_derivative_url('thumbnail')
             )
         return _("No image")
 
@@ -138,7 +148,8 @@ class ProductAdmin(ExportMixin, ActivationMixin, TimestampedAdminMixin, admin.Mo
     def get_queryset(self, request):
         return super().get_queryset(request).prefetch_related(
             'variants',
-            'category'
+            # Category.__str__ shows the parent's name
+            'category__parent'
         ).annotate(
             variants_count=Count('variants', filter=Q(variants__is_active=True)),
             total_stock_count=Sum('variants__stock_quantity')
@@ -167,6 +178,87 @@ class ProductAdmin(ExportMixin, ActivationMixin, TimestampedAdminMixin, admin.Mo
     def get_category(self, obj):
         return obj.category.name
 
+    def get_urls(self):
+        urls = super().get_urls()
+        info = (self.model._meta.app_label, self.model._meta.model_name)
+        custom_urls = [
+            path(
+                'import/',
+                # Each import batch commits on its own instead of inside the request transaction
+                transaction.non_atomic_requests(self.admin_site.admin_view(self.import_view)),
+                name='%s_%s_import' % info
+            ),
+            path(
+                'export/',
+                self.admin_site.admin_view(self.export_view),
+                name='%s_%s_export' % info
+            ),
+            path(
+                'download-template/',
+                self.admin_site.admin_view(self.download_template_view),
+                name='%s_%s_download_template' % info
+            ),
+        ]
+        return custom_urls + urls
+
+    def import_view(self, request):
+        """Bulk import products and variants from a CSV or NDJSON file."""
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            raise PermissionDenied
+
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title=_('Import Products'),
+            categories=Category.objects.filter(is_active=True),
+        )
+
+        if request.method == 'POST' and request.FILES.get('file'):
+            upload = request.FILES['file']
+            file_format = 'ndjson' if upload.name.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+            category = Category.objects.filter(pk=request.POST.get('category') or None).first()
+            importer = CatalogImporter(default_category=category, user=request.user)
+            try:
+                result = importer.run(upload.file, file_format)
+            except RowError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, _('Imported %(imported)s of %(rows)s rows into %(products)s products.') % {
+                    'imported': result.imported,
+                    'rows': result.rows,
+                    'products': len(result.product_ids),
+                })
+                if result.errors:
+                    messages.error(request, _('%(count)s rows were skipped, see the error report below.') % {
+                        'count': len(result.errors),
+                    })
+                context.update(preview_data=result.preview, import_errors=result.errors[:IMPORT_ERRORS_SHOWN])
+
+        return render(request, 'admin/store/product/import.html', context)
+
+    def export_view(self, request):
+        """Stream the active catalog as CSV, or NDJSON with ``?format=ndjson``."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        file_format = request.GET.get('format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            file_format = 'csv'
+        exporter = CatalogExporter(base_url=request.build_absolute_uri('/'))
+        response = StreamingHttpResponse(
+            exporter.stream(file_format),
+            content_type=EXPORT_FORMATS[file_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="catalog.{file_format}"'
+        return response
+
+    def download_template_view(self, request):
+        """Example import file listing every supported column."""
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="product_import_template.csv"'
+        write_template(response)
+        return response
+
     class Media:
         css = {
             'all': ('admin/css/product.css',)
@@ -341,7 +433,9 @@ class StockHistoryAdmin(admin.ModelAdmin):
         'note',
         'created_at'
     ]
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    # Avoid a second COUNT(*) over the whole history table on every page
+    show_full_result_count = False
 
     def has_add_permission(self, request):
         return False
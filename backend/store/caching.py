@@ -0,0 +1,113 @@
+from django.core.cache import cache
+import hashlib
+import time
+
+CATALOG_VERSION_KEY = 'store:version:catalog'
+OBJECT_CACHE_TIMEOUT = 60 * 60
+
+
+def get_version(key):
+    """
+    Version counter stored under ``key`` in the shared cache.
+
+    A missing counter (cold or flushed cache) restarts from the current time in
+    milliseconds so it never reuses a version that clients may still hold.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_version(key)
+
+
+def get_catalog_version():
+    """Version counter covering every catalog change."""
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    return bump_version(CATALOG_VERSION_KEY)
+
+
+def get_versioned_payload(name, version, build, timeout=OBJECT_CACHE_TIMEOUT):
+    """
+    Return the cached payload stored under ``name`` and ``version``, building it
+    with ``build()`` on a miss. Bumping the version makes old entries unreachable,
+    so nothing needs to be deleted when the object changes.
+    """
+    key = 'store:payload:{}:{}'.format(name, hashlib.sha1(repr(version).encode('utf-8')).hexdigest())
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, timeout)
+    return payload
+
+
+CATEGORY_TAG = 'categories'
+COUNTER_TAG = 'category-counters'
+PRODUCT_TAG = 'products'
+TAG_KEY = 'store:tag:{}'
+# How long a rebuild may hold the lock, and how long others wait for its result
+BUILD_LOCK_TIMEOUT = 30
+BUILD_WAIT = 5
+BUILD_POLL_INTERVAL = 0.05
+
+
+def tag_key(tag):
+    return TAG_KEY.format(tag)
+
+
+def get_tag_versions(tags):
+    """Current version of every tag, in one cache round trip when they exist."""
+    keys = [tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    return tuple(versions[key] if key in versions else get_version(key) for key in keys)
+
+
+def purge_tags(*tags):
+    """Invalidate every entry stored with any of ``tags``."""
+    for tag in tags:
+        bump_version(tag_key(tag))
+
+
+def get_tagged_payload(name, parts, tags, build, timeout=OBJECT_CACHE_TIMEOUT):
+    """
+    Return the payload cached under ``name`` and ``parts``, building it with
+    ``build()`` on a miss. Entries are keyed by the current versions of their
+    ``tags``, so ``purge_tags()`` drops them all at once.
+
+    Rebuilds are single-flight: the first miss takes a lock and builds, and
+    concurrent misses for the same key wait for its result instead of running
+    the same queries. They build it themselves only if it doesn't show up in time.
+    """
+    key = 'store:tagged:{}:{}'.format(
+        name,
+        hashlib.sha1(repr((parts, get_tag_versions(tags))).encode('utf-8')).hexdigest()
+    )
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, BUILD_LOCK_TIMEOUT):
+        deadline = time.monotonic() + BUILD_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(BUILD_POLL_INTERVAL)
+            payload = cache.get(key)
+            if payload is not None:
+                return payload
+        return build()
+
+    try:
+        payload = build()
+        cache.set(key, payload, timeout)
+    finally:
+        cache.delete(lock_key)
+    return payload
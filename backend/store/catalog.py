@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db.models import F, Max, Min, OuterRef, Subquery
+import logging
+import re
+
+from .models import Product, ProductVariant, ProductCard, ProductImage
+from .prefetch import plan_queryset
+from .serializers import ProductCardSerializer
+from .serializers.compiled import compile_products
+
+logger = logging.getLogger(__name__)
+
+CARD_BATCH_SIZE = 500
+
+
+def build_search_vector():
+    """
+    Weighted search document: name (A) > SKUs (B) > description (C).
+
+    Name and description are indexed with every configured language; SKUs use
+    the ``simple`` config so codes are not stemmed.
+    """
+    skus = ProductVariant.objects.filter(
+        product=OuterRef('pk')
+    ).order_by().values('product').annotate(
+        skus=StringAgg('sku', ' ')
+    ).values('skus')
+
+    vector = SearchVector(Subquery(skus), config='simple', weight='B')
+    for config in settings.STORE_SEARCH_CONFIGS:
+        vector += SearchVector('name', config=config, weight='A')
+        vector += SearchVector('description', config=config, weight='C')
+    return vector
+
+
+def build_price_bound(aggregate):
+    """Base price plus the min/max adjustment of the product's active variants."""
+    adjustment = ProductVariant.objects.filter(
+        product=OuterRef('pk'),
+        is_active=True
+    ).order_by().values('product').annotate(
+        adjustment=aggregate('price_adjustment')
+    ).values('adjustment')
+    return F('base_price') + Subquery(adjustment)
+
+
+def refresh_product_columns(product_ids):
+    """Bump the version and recompute the search document and price range of products."""
+    return Product.objects.filter(pk__in=product_ids).update(
+        version=F('version') + 1,
+        search_vector=build_search_vector(),
+        min_final_price=build_price_bound(Min),
+        max_final_price=build_price_bound(Max),
+    )
+
+
+def refresh_products(product_ids):
+    """Refresh all denormalized data derived from the given products."""
+    product_ids = list(set(product_ids))
+    refresh_product_columns(product_ids)
+    return refresh_product_cards(product_ids)
+
+
+def get_card_queryset():
+    """Queryset with everything ProductCardSerializer touches loaded up front."""
+    return plan_queryset(Product.objects.all(), ProductCardSerializer)
+
+
+def absolutize_card_urls(card_json, request):
+    """
+    Card JSON text with its image URLs made absolute for ``request``.
+
+    Cards are built without a request, so they hold site-relative media URLs
+    (``/media/products/...``) that don't depend on the host that built them.
+    Rewriting the encoded text keeps the list from decoding every card.
+    """
+    media_url = ProductImage._meta.get_field('image').storage.base_url
+    if request is None or not media_url.startswith('/'):
+        return card_json
+    # Image URLs sit under the image's "image" key and one key per derivative format
+    keys = '|'.join(re.escape(key) for key in ('image', *settings.STORE_IMAGE_FORMATS))
+    pattern = re.compile(f'("(?:{keys})":\\s*"){re.escape(media_url)}')
+    prefix = request.build_absolute_uri(media_url)
+    return pattern.sub(lambda match: match.group(1) + prefix, card_json)
+
+
+def refresh_product_cards(product_ids):
+    """Rebuild the ProductCard documents for the given products."""
+    product_ids = list(set(product_ids))
+    refreshed = []
+    for start in range(0, len(product_ids), CARD_BATCH_SIZE):
+        batch = product_ids[start:start + CARD_BATCH_SIZE]
+        if settings.STORE_COMPILED_SERIALIZERS:
+            cards = [
+                ProductCard(product_id=product_id, data=data)
+                for product_id, data in compile_products(batch, card=True).items()
+            ]
+        else:
+            products = get_card_queryset().filter(pk__in=batch)
+            cards = [
+                ProductCard(product=product, data=ProductCardSerializer(product).data)
+                for product in products
+            ]
+        ProductCard.objects.bulk_create(
+            cards,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['data', 'updated_at']
+        )
+        refreshed.extend(cards)
+
+    logger.info(f"Refreshed {len(refreshed)} product cards")
+    return refreshed
@@ -0,0 +1,119 @@
+"""
+In-process snapshot of the category tree.
+
+The tree is small and rarely changes, so every worker keeps all categories in
+memory and serves category payloads and children without queries.
+The snapshot is tagged with a version counter kept in the shared cache; each
+lookup compares the two (one cache GET) and rebuilds the snapshot with a single
+query when a Category change has bumped the counter.
+"""
+from collections import defaultdict
+import threading
+
+from .caching import CATEGORY_TAG, get_version, purge_tags, tag_key
+from .models import Category
+
+# Purging the categories tag also makes every worker rebuild its snapshot
+CATEGORY_TREE_VERSION_KEY = tag_key(CATEGORY_TAG)
+
+# Counters change with every stock movement and are read from the rows instead,
+# see store.counters.get_counters()
+CATEGORY_TREE_FIELDS = (
+    'id', 'name', 'slug', 'description', 'parent_id', 'is_active',
+    'path', 'depth', 'version', 'created_at', 'updated_at',
+)
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def compile_categories(rows=None):
+    """Payloads shaped like CategoryResponseSerializer for every category, by id."""
+    if rows is None:
+        rows = Category.objects.order_by('name').values(*CATEGORY_TREE_FIELDS)
+    rows = list(rows)
+    children = defaultdict(list)
+    for row in rows:
+        if row['parent_id'] is not None and row['is_active']:
+            children[row['parent_id']].append(row['id'])
+
+    by_id = {row['id']: row for row in rows}
+    payloads = {}
+
+    def build(category_id):
+        if category_id not in payloads:
+            row = by_id[category_id]
+            payloads[category_id] = {
+                'id': row['id'],
+                'name': row['name'],
+                'slug': row['slug'],
+                'description': row['description'],
+                'parent': row['parent_id'],
+                'children': [build(child_id) for child_id in children[category_id]],
+                'is_active': row['is_active'],
+            }
+        return payloads[category_id]
+
+    for row in rows:
+        build(row['id'])
+    return payloads
+
+
+class CategoryTree:
+    """
+    Every category as ``.values()`` rows plus serialized payloads, ordered by name.
+
+    Shared between threads and requests: treat everything it returns as
+    read-only and copy before modifying.
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.rows = tuple(rows)
+        self.by_id = {row['id']: row for row in self.rows}
+        self.by_slug = {row['slug']: row for row in self.rows}
+        self.payloads = compile_categories(self.rows)
+
+    def get(self, pk):
+        return self.by_id.get(pk)
+
+    def get_by_slug(self, slug):
+        return self.by_slug.get(slug)
+
+    def get_payload(self, pk):
+        return self.payloads.get(pk)
+
+    def get_detail_payload(self, pk, counters):
+        """Payload shaped like CategoryDetailResponseSerializer, given the category's counters."""
+        if pk not in self.payloads:
+            return None
+        return dict(self.payloads[pk], **counters)
+
+    def get_children(self, pk):
+        """Payloads of the active children of a category."""
+        payload = self.payloads.get(pk)
+        return payload['children'] if payload else []
+
+
+def get_category_tree():
+    """The current snapshot, rebuilt when the shared version has moved on."""
+    global _snapshot
+    # Read the version before the rows, so a change committed in between
+    # only makes the next lookup rebuild again
+    version = get_version(CATEGORY_TREE_VERSION_KEY)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = CategoryTree(
+                version,
+                Category.objects.order_by('name').values(*CATEGORY_TREE_FIELDS)
+            )
+        return _snapshot
+
+
+def bump_category_tree_version():
+    """Make every worker rebuild its snapshot on next use."""
+    purge_tags(CATEGORY_TAG)
@@ -0,0 +1,173 @@
+"""
+Denormalized per-category product and variant counters.
+
+Every category stores how many active products it holds and how many active,
+in-stock variants those products have, both directly and for its whole subtree.
+Single-row saves adjust the counters with ``F()`` deltas in the same
+transaction (see ``store.signals``); bulk writes recount the categories they
+touched with ``recount_categories``.
+
+Counters move with every stock change, so they are not part of the in-process
+category tree snapshot: responses read them from the rows with ``get_counters``
+and changes only purge the cache entries tagged with COUNTER_TAG.
+"""
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .caching import COUNTER_TAG, purge_tags
+from .models import Category, Product, ProductVariant
+
+
+def get_counters(category_ids):
+    """``{category_id: {counter: value}}`` for the given categories, with one query."""
+    return {
+        row.pop('pk'): row
+        for row in Category.objects.filter(pk__in=category_ids).values('pk', *Category.COUNTER_FIELDS)
+    }
+
+
+def purge_counter_cache():
+    purge_tags(COUNTER_TAG)
+
+
+def counted_variants():
+    """Variants included in ``variant_count``."""
+    return ProductVariant.objects.filter(is_active=True, stock_quantity__gt=0, product__is_active=True)
+
+
+def apply_deltas(deltas):
+    """
+    Add ``{category_id: (products, variants)}`` to the direct counters of each
+    category and to the subtree counters of it and its ancestors, with one
+    UPDATE per category.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if pk and any(delta)}
+    if not deltas:
+        return
+
+    paths = dict(Category.objects.filter(pk__in=deltas).values_list('pk', 'path'))
+    for category_id, (products, variants) in deltas.items():
+        # The path lists the ancestors and the category itself
+        ids = [int(pk) for pk in paths.get(category_id, '').strip('/').split('/') if pk] or [category_id]
+
+        def direct(amount):
+            return Case(When(pk=category_id, then=Value(amount)), default=Value(0))
+
+        Category.objects.filter(pk__in=ids).update(
+            product_count=F('product_count') + direct(products),
+            variant_count=F('variant_count') + direct(variants),
+            subtree_product_count=F('subtree_product_count') + products,
+            subtree_variant_count=F('subtree_variant_count') + variants
+        )
+    transaction.on_commit(purge_counter_cache)
+
+
+def recount_categories(category_ids=None):
+    """
+    Recompute the direct counters of the given categories (all when None) with
+    one aggregate query, then the subtree counters of every category above them.
+    """
+    categories = Category.objects.all()
+    if category_ids is not None:
+        category_ids = {pk for pk in category_ids if pk}
+        if not category_ids:
+            return
+        categories = categories.filter(pk__in=category_ids)
+
+    products = Product.objects.filter(
+        category=OuterRef('pk'), is_active=True
+    ).order_by().values('category').annotate(total=Count('pk')).values('total')
+    variants = counted_variants().filter(
+        product__category=OuterRef('pk')
+    ).order_by().values('product__category').annotate(total=Count('pk')).values('total')
+    categories.update(
+        product_count=Coalesce(Subquery(products, output_field=IntegerField()), Value(0)),
+        variant_count=Coalesce(Subquery(variants, output_field=IntegerField()), Value(0))
+    )
+
+    # Subtree totals of the recounted categories and their ancestors; paths only
+    # hold digits and slashes, so they are safe LIKE prefixes
+    table = connection.ops.quote_name(Category._meta.db_table)
+    condition = ''
+    params = []
+    if category_ids is not None:
+        condition = f"""
+            WHERE EXISTS (
+                SELECT 1 FROM {table} AS changed
+                WHERE changed.id = ANY(%s) AND changed.path LIKE category.path || '%%'
+            )
+        """
+        params = [list(category_ids)]
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {table} SET
+                subtree_product_count = totals.products,
+                subtree_variant_count = totals.variants
+            FROM (
+                SELECT category.id, SUM(descendant.product_count) AS products,
+                       SUM(descendant.variant_count) AS variants
+                FROM {table} AS category
+                JOIN {table} AS descendant ON descendant.path LIKE category.path || '%%'
+                {condition}
+                GROUP BY category.id
+            ) AS totals
+            WHERE {table}.id = totals.id
+        """, params)
+    transaction.on_commit(purge_counter_cache)
+
+
+def recount_product_categories(product_ids, category_ids=()):
+    """Recount the categories of the given products, plus ``category_ids``."""
+    category_ids = set(category_ids)
+    category_ids.update(
+        Product.objects.filter(pk__in=product_ids).values_list('category_id', flat=True)
+    )
+    recount_categories(category_ids)
+
+
+def count_product_change(product_id, old, new):
+    """
+    Adjust the counters for a product saved or deleted. ``old`` and ``new`` are
+    ``(category_id, is_active)`` before and after, None when it didn't exist.
+    """
+    if old == new:
+        return
+    variants = 0
+    if old is not None and new is not None:
+        # New products have no variants yet, deleted ones lose theirs first
+        # through their own signals
+        variants = ProductVariant.objects.filter(
+            product_id=product_id, is_active=True, stock_quantity__gt=0
+        ).count()
+
+    deltas = {}
+    for state, sign in ((old, -1), (new, 1)):
+        if state is not None and state[1]:
+            products, counted = deltas.get(state[0], (0, 0))
+            deltas[state[0]] = (products + sign, counted + sign * variants)
+    apply_deltas(deltas)
+
+
+def count_variant_change(old, new):
+    """
+    Adjust the counters for a variant saved or deleted. ``old`` and ``new`` are
+    ``(product_id, in stock and active)`` before and after, None when it didn't exist.
+    """
+    old = old if old and old[1] else None
+    new = new if new and new[1] else None
+    if old == new:
+        return
+
+    products = {
+        pk: (category_id, is_active)
+        for pk, category_id, is_active in Product.objects.filter(
+            pk__in=[state[0] for state in (old, new) if state]
+        ).values_list('pk', 'category_id', 'is_active')
+    }
+    deltas = {}
+    for state, sign in ((old, -1), (new, 1)):
+        if state is not None and state[0] in products and products[state[0]][1]:
+            category_id = products[state[0]][0]
+            deltas[category_id] = (0, deltas.get(category_id, (0, 0))[1] + sign)
+    apply_deltas(deltas)
@@ -0,0 +1,120 @@
+"""
+Streaming export of the active catalog for marketplace feeds and analytics.
+
+Rows describe one active variant each, together with its product, final price,
+stock and image URLs; the columns are a superset of the import format, so an
+export can be imported again. Rows are read through a server-side cursor in
+fixed-size chunks and written out as they arrive, so memory use doesn't grow
+with the size of the catalog.
+"""
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, OuterRef, Q
+import csv
+import io
+import json
+
+from .importers import IMPORT_COLUMNS
+from .models import ProductImage, ProductVariant
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPORT_COLUMNS = IMPORT_COLUMNS + ['final_price', 'images']
+
+
+class CatalogExporter:
+    """
+    Write every active variant of every active product as CSV or NDJSON.
+
+    ``base_url`` is prepended to relative image URLs, e.g.
+    ``https://shop.example.com``.
+    """
+
+    def __init__(self, base_url='', chunk_size=EXPORT_CHUNK_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.chunk_size = chunk_size
+        self.storage = ProductImage._meta.get_field('image').storage
+
+    def get_queryset(self):
+        # Product images plus the ones of this variant, in display order
+        images = ProductImage.objects.filter(
+            Q(variant__isnull=True) | Q(variant=OuterRef('pk')),
+            product=OuterRef('product_id'),
+            is_active=True
+        ).order_by('order', 'created_at').values('image')
+
+        return ProductVariant.objects.filter(
+            is_active=True,
+            product__is_active=True
+        ).annotate(
+            name=F('product__name'),
+            slug=F('product__slug'),
+            description=F('product__description'),
+            base_price=F('product__base_price'),
+            category=F('product__category__slug'),
+            meta_title=F('product__meta_title'),
+            meta_description=F('product__meta_description'),
+            final_price=F('product__base_price') + F('price_adjustment'),
+            image_names=ArraySubquery(images),
+        ).order_by('product_id', 'pk').values(
+            'sku', 'name', 'slug', 'description', 'base_price', 'category',
+            'price_adjustment', 'stock_quantity', 'attributes', 'is_active',
+            'meta_title', 'meta_description', 'final_price', 'image_names'
+        )
+
+    def image_url(self, name):
+        url = self.storage.url(name)
+        return url if '://' in url else f'{self.base_url}{url}'
+
+    def rows(self):
+        """Yield one dict per variant, keyed by EXPORT_COLUMNS."""
+        for row in self.get_queryset().iterator(chunk_size=self.chunk_size):
+            row['images'] = [self.image_url(name) for name in row.pop('image_names') if name]
+            yield row
+
+    def stream(self, file_format='csv'):
+        """Yield the export as text, one chunk per ``chunk_size`` rows."""
+        if file_format == 'ndjson':
+            return self.iter_ndjson()
+        return self.iter_csv()
+
+    def iter_csv(self):
+        """CSV with JSON attributes and space-separated image URLs."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for count, row in enumerate(self.rows(), start=1):
+            row['attributes'] = json.dumps(row['attributes'])
+            row['images'] = ' '.join(row['images'])
+            row['is_active'] = 'true' if row['is_active'] else 'false'
+            writer.writerow(row)
+            if count % self.chunk_size == 0:
+                yield _drain(buffer)
+        if buffer.tell():
+            yield _drain(buffer)
+
+    def iter_ndjson(self):
+        buffer = io.StringIO()
+        for count, row in enumerate(self.rows(), start=1):
+            buffer.write(json.dumps(row, cls=DjangoJSONEncoder))
+            buffer.write('\n')
+            if count % self.chunk_size == 0:
+                yield _drain(buffer)
+        if buffer.tell():
+            yield _drain(buffer)
+
+    def export(self, stream, file_format='csv'):
+        """Write the whole export to a text stream."""
+        for chunk in self.stream(file_format):
+            stream.write(chunk)
+
+
+def _drain(buffer):
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
@@ -0,0 +1,196 @@
+from functools import reduce
+from operator import and_, or_
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Exists, F, FloatField, OuterRef, Q
+from django.db.models.functions import Cast
+from rest_framework import filters
+from rest_framework.settings import api_settings
+import django_filters
+
+from .category_tree import get_category_tree
+from .models import Category, Product, ProductVariant
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    ``?category=`` takes a category id or slug, active or not; with
+    ``include_descendants=true`` it matches products anywhere in the category's
+    subtree through a prefix match on the indexed category path.
+    """
+    category = django_filters.CharFilter(
+        method='filter_category',
+        label='Category id or slug'
+    )
+    include_descendants = django_filters.BooleanFilter(
+        method='filter_include_descendants',
+        label='Include products of all subcategories of category'
+    )
+
+    class Meta:
+        model = Product
+        fields = ['category', 'include_descendants', 'is_active']
+
+    def filter_category(self, queryset, name, value):
+        # Resolved from the in-process category tree, which holds inactive
+        # categories too; a category the snapshot doesn't know yet is read directly
+        is_id = value.isascii() and value.isdigit()
+        tree = get_category_tree()
+        category = tree.get(int(value)) if is_id else tree.get_by_slug(value)
+        if category is None:
+            category = Category.objects.filter(
+                **{'pk': int(value)} if is_id else {'slug': value}
+            ).values('id', 'path').first()
+        if category is None:
+            return queryset.none()
+        if self.form.cleaned_data.get('include_descendants') and category['path']:
+            return queryset.filter(category__path__startswith=category['path'])
+        return queryset.filter(category_id=category['id'])
+
+    def filter_include_descendants(self, queryset, name, value):
+        # Read by filter_category
+        return queryset
+
+
+class ProductSearchFilter(filters.BaseFilterBackend):
+    """
+    Ranked full-text search over Product.search_vector.
+
+    Matches the ``search`` query parameter against every configured language
+    plus the ``simple`` config (for SKUs) and annotates ``search_rank``.
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def get_search_query(self, request):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return None
+
+        query = SearchQuery(terms, config='simple', search_type='websearch')
+        for config in settings.STORE_SEARCH_CONFIGS:
+            query |= SearchQuery(terms, config=config, search_type='websearch')
+        return query
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if query is None:
+            return queryset
+        # ts_rank() returns a real, which doesn't survive the round trip through
+        # a pagination cursor exactly; as a double the cursor matches its own row
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        )
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search over name, SKU and description',
+            'schema': {'type': 'string'},
+        }]
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """
+    Ordering filter that sorts search results by relevance by default and
+    accepts ``price`` as an alias for the indexed minimum final price.
+    """
+    ordering_aliases = {'price': 'min_final_price'}
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        ordering = super().remove_invalid_fields(queryset, fields, view, request)
+        return [
+            ('-' if term.startswith('-') else '') + self.ordering_aliases.get(term.lstrip('-'), term.lstrip('-'))
+            for term in ordering
+        ]
+
+    def get_default_ordering(self, view):
+        if view.request.query_params.get(api_settings.SEARCH_PARAM, '').strip():
+            return ['-search_rank']
+        return super().get_default_ordering(view)
+
+
+class ProductAttributeFilter(filters.BaseFilterBackend):
+    """
+    Filter products by variant attributes, e.g. ``?attr.size=M&attr.color=Red``.
+
+    Repeating a parameter matches any of its values. A product matches when one
+    of its active variants has all requested attributes; the containment lookup
+    is served by the jsonb_path_ops GIN index on ProductVariant.attributes.
+    """
+    param_prefix = 'attr.'
+
+    def get_attribute_filters(self, request):
+        attribute_filters = {}
+        for param in request.query_params:
+            if param.startswith(self.param_prefix) and len(param) > len(self.param_prefix):
+                values = [value for value in request.query_params.getlist(param) if value]
+                if values:
+                    attribute_filters[param[len(self.param_prefix):]] = values
+        return attribute_filters
+
+    def filter_queryset(self, request, queryset, view):
+        return self.filter_attributes(queryset, self.get_attribute_filters(request))
+
+    def get_variant_condition(self, attribute_filters):
+        """Condition on a variant matching every ``{name: [values]}`` filter."""
+        return reduce(and_, [
+            reduce(or_, [Q(attributes__contains={name: value}) for value in values])
+            for name, values in attribute_filters.items()
+        ], Q())
+
+    def filter_attributes(self, queryset, attribute_filters):
+        """Products with an active variant matching every ``{name: [values]}`` filter."""
+        if not attribute_filters:
+            return queryset
+
+        variants = ProductVariant.objects.filter(
+            self.get_variant_condition(attribute_filters), product=OuterRef('pk'), is_active=True
+        )
+        return queryset.filter(Exists(variants))
+
+    def get_facets(self, queryset, request):
+        """
+        Count products per attribute value in one aggregate query.
+
+        ``queryset`` has every filter applied except the attribute filters. Each
+        attribute's counts apply the other attributes' selections but not its
+        own, so selecting a value keeps the alternatives and their counts visible.
+        A value is counted from the variants matching those selections only, the
+        same variants ``filter_attributes`` matches, so choosing it never comes
+        back empty. Returns ``{'size': {'M': 12, 'L': 4}, 'color': {...}}``.
+        """
+        attribute_filters = self.get_attribute_filters(request)
+        products = queryset.order_by().values('pk')
+
+        # Unselected attributes count over variants matching every selection,
+        # each selected one over the variants matching the other selections
+        parts = [(attribute_filters, 'NOT (attr.key = ANY(%s))', [list(attribute_filters)])]
+        for name in attribute_filters:
+            others = {other: values for other, values in attribute_filters.items() if other != name}
+            parts.append((others, 'attr.key = %s', [name]))
+
+        statements = []
+        params = []
+        for selection, key_condition, key_params in parts:
+            variants_sql, variants_params = ProductVariant.objects.filter(
+                self.get_variant_condition(selection), is_active=True, product__in=products
+            ).order_by().values('product_id', 'attributes').query.sql_with_params()
+            statements.append(f"""
+                SELECT attr.key, attr.value, COUNT(DISTINCT variant.product_id)
+                FROM ({variants_sql}) AS variant
+                CROSS JOIN LATERAL jsonb_each_text(variant.attributes) AS attr(key, value)
+                WHERE {key_condition}
+                GROUP BY attr.key, attr.value
+            """)
+            params.extend([*variants_params, *key_params])
+        sql = ' UNION ALL '.join(statements) + ' ORDER BY 1, 2'
+
+        facets = {}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for name, value, count in cursor.fetchall():
+                facets.setdefault(name, {})[value] = count
+        return facets
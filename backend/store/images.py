@@ -0,0 +1,202 @@
+"""
+Background generation of resized WebP/AVIF derivatives for product images.
+
+Saving a ProductImage schedules its derivatives once the transaction commits. A
+small thread pool reads the original from storage, hands the decoding and
+encoding to a process pool (see ``imaging.py``), writes the results back to
+storage and records them on ``ProductImage.derivatives``.
+
+Originals live in content-addressed storage (see ``storage.py``), so several
+images can share one file and its derivatives. Files are reference counted by
+the ProductImage rows pointing at them and only deleted with the last one.
+Uploads store their files before creating the rows, so files stored or reused
+within ``STORE_IMAGE_RELEASE_GRACE`` are kept even when nothing references them
+yet; ``manage.py prune_image_files`` deletes the ones that stay unreferenced.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.utils import timezone
+from datetime import timedelta
+import multiprocessing
+import posixpath
+import threading
+import logging
+
+from .caching import bump_catalog_version
+from .catalog import refresh_products
+from .imaging import render_derivatives, supported_formats
+from .models import ProductImage
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_process_pool = None
+_dispatcher = None
+
+
+def get_process_pool():
+    """Process pool doing the CPU-bound Pillow work, created on first use."""
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            # Spawned workers don't inherit the server's threads, locks or connections
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.STORE_IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _process_pool
+
+
+def get_dispatcher():
+    global _dispatcher
+    with _lock:
+        if _dispatcher is None:
+            _dispatcher = ThreadPoolExecutor(
+                max_workers=settings.STORE_IMAGE_WORKERS,
+                thread_name_prefix='image-derivatives'
+            )
+        return _dispatcher
+
+
+def needs_derivatives(image):
+    return bool(image.image) and image.derivatives.get('source') != image.image.name
+
+
+def derivative_name(source, size, fmt):
+    """``products/ab/cd/abcd...ef.jpg`` -> ``products/ab/cd/abcd...ef/thumbnail.webp``"""
+    stem, _ = posixpath.splitext(source)
+    return f'{stem}/{size}.{fmt}'
+
+
+def get_image_storage():
+    return ProductImage._meta.get_field('image').storage
+
+
+def is_recently_used(storage, name):
+    """Whether a file was stored or reused within the release grace period."""
+    try:
+        modified = storage.get_modified_time(name)
+    except FileNotFoundError:
+        return False
+    return modified > timezone.now() - timedelta(seconds=settings.STORE_IMAGE_RELEASE_GRACE)
+
+
+def release_image_file(name):
+    """
+    Delete an original and its derivatives once no image references it and it
+    wasn't used within the grace period. Returns True when the files were deleted.
+    """
+    if not name:
+        return False
+    storage = get_image_storage()
+    # Checked before the references: an upload refreshes the time before creating its row
+    if is_recently_used(storage, name):
+        return False
+    if ProductImage.objects.filter(image=name).exists():
+        return False
+    # Derivative names are deterministic, this also catches ones still being recorded
+    for size in settings.STORE_IMAGE_DERIVATIVES:
+        for fmt in settings.STORE_IMAGE_FORMATS:
+            storage.delete(derivative_name(name, size, fmt))
+    storage.delete(name)
+    return True
+
+
+def iter_original_names(storage, directory):
+    """Names of the content-addressed originals stored below ``directory``."""
+    directories, files = storage.listdir(directory)
+    for filename in files:
+        # Derivatives are named after their size, originals after their digest
+        stem = posixpath.splitext(filename)[0]
+        if len(stem) == 40 and all(char in '0123456789abcdef' for char in stem):
+            yield posixpath.join(directory, filename)
+    for subdirectory in directories:
+        yield from iter_original_names(storage, posixpath.join(directory, subdirectory))
+
+
+def prune_image_files():
+    """
+    Delete the originals (and their derivatives) that no image references and
+    that weren't used within the grace period. Returns the number deleted.
+    """
+    storage = get_image_storage()
+    directory = ProductImage._meta.get_field('image').upload_to
+    if not storage.exists(directory):
+        return 0
+    referenced = set(ProductImage.objects.values_list('image', flat=True))
+    return sum(
+        1 for name in iter_original_names(storage, directory)
+        if name not in referenced and release_image_file(name)
+    )
+
+
+def render_and_store(image):
+    """Render the derivatives of an image's file and write them to storage."""
+    formats = supported_formats(settings.STORE_IMAGE_FORMATS)
+    storage = image.image.storage
+    source = image.image.name
+    with image.image.open('rb') as original:
+        data = original.read()
+
+    rendered = get_process_pool().submit(
+        render_derivatives, data, settings.STORE_IMAGE_DERIVATIVES, formats
+    ).result()
+
+    sizes = {}
+    for size, result in rendered.items():
+        entry = {'width': result['width'], 'height': result['height']}
+        for fmt, content in result['files'].items():
+            entry[fmt] = storage.save_derived(derivative_name(source, size, fmt), ContentFile(content))
+        sizes[size] = entry
+    return {'source': source, 'sizes': sizes}
+
+
+def generate_derivatives(image_id, force=False):
+    """
+    Build and store the derivatives of one image. Returns the new ``derivatives``
+    document, or None when the image is gone or changed while being processed.
+    ``force`` renders them again even when another image already has them.
+    """
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return None
+
+    source = image.image.name
+    derivatives = None
+    if not force:
+        # Another image with the same content may already have them
+        derivatives = ProductImage.objects.filter(
+            image=source, derivatives__source=source
+        ).exclude(pk=image_id).values_list('derivatives', flat=True).first()
+    if derivatives is None:
+        derivatives = render_and_store(image)
+
+    # Skip the write if the image was replaced or deleted in the meantime
+    if not ProductImage.objects.filter(pk=image_id, image=source).update(derivatives=derivatives):
+        release_image_file(source)
+        return None
+
+    # Product payloads embed image data; update() bypasses the change signals
+    refresh_products([image.product_id])
+    bump_catalog_version()
+    logger.info(f'Generated {len(derivatives["sizes"])} derivatives for image {image_id}')
+    return derivatives
+
+
+def _generate_in_background(image_id):
+    try:
+        generate_derivatives(image_id)
+    except Exception:
+        logger.exception(f'Error generating derivatives for image {image_id}')
+    finally:
+        # Dispatcher threads are long-lived; don't leave connections open between jobs
+        connections.close_all()
+
+
+def schedule_derivatives(*image_ids):
+    """Generate derivatives for the given images in the background."""
+    dispatcher = get_dispatcher()
+    for image_id in image_ids:
+        dispatcher.submit(_generate_in_background, image_id)
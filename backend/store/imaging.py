@@ -0,0 +1,44 @@
+"""
+Pillow side of the image derivative pipeline.
+
+This module runs inside worker processes, so it must not import Django models or
+anything that needs the app registry.
+"""
+from PIL import Image, ImageOps
+import io
+
+FORMAT_OPTIONS = {
+    'webp': {'quality': 80, 'method': 4},
+    'avif': {'quality': 60, 'speed': 6},
+}
+
+
+def supported_formats(formats):
+    """The subset of ``formats`` this Pillow build can encode."""
+    Image.init()
+    return [fmt for fmt in formats if fmt.upper() in Image.SAVE]
+
+
+def render_derivatives(data, sizes, formats):
+    """
+    Resize an encoded image to every size and encode each copy in every format.
+
+    ``sizes`` maps a derivative name to a ``(width, height)`` bounding box; images
+    are never upscaled. Returns ``{name: {'width', 'height', 'files': {format: bytes}}}``.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+        has_alpha = original.mode in ('RGBA', 'LA', 'PA') or 'transparency' in original.info
+        original = original.convert('RGBA' if has_alpha else 'RGB')
+
+        rendered = {}
+        for name, (width, height) in sizes.items():
+            image = original.copy()
+            image.thumbnail((width, height), Image.Resampling.LANCZOS)
+            files = {}
+            for fmt in formats:
+                buffer = io.BytesIO()
+                image.save(buffer, format=fmt.upper(), **FORMAT_OPTIONS.get(fmt, {}))
+                files[fmt] = buffer.getvalue()
+            rendered[name] = {'width': image.width, 'height': image.height, 'files': files}
+        return rendered
@@ -0,0 +1,560 @@
+"""
+Bulk catalog import and variant upserts.
+
+Rows describe one variant each, together with its product. The file is streamed
+and processed in batches: rows are validated in Python, products are upserted by
+slug, variants are staged with ``COPY`` and merged with a single
+``INSERT ... ON CONFLICT (sku)`` that also records stock history. Model ``save()``
+and ``full_clean()`` are never called per row; denormalized product data is
+refreshed once per batch after it commits.
+"""
+from decimal import Decimal, InvalidOperation
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+import csv
+import io
+import json
+import logging
+
+from .models import Category, Product, ProductVariant, StockHistory, attributes_signature
+from .counters import recount_product_categories
+from .signals import schedule_product_refresh
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 5000
+
+IMPORT_COLUMNS = [
+    'sku', 'name', 'slug', 'description', 'base_price', 'category',
+    'price_adjustment', 'stock_quantity', 'attributes', 'is_active',
+    'meta_title', 'meta_description',
+]
+REQUIRED_COLUMNS = ['sku', 'name', 'description', 'base_price']
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n'}
+
+STAGING_TABLE = 'store_import_variant'
+STAGING_COLUMNS = [
+    'sku', 'product_id', 'attributes', 'attribute_signature', 'price_adjustment',
+    'stock_quantity', 'is_active'
+]
+
+
+class RowError(ValueError):
+    """A row that can't be imported; the message ends up in the error report."""
+
+
+class ImportResult:
+    """Counters and per-row errors of an import run."""
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.product_ids = set()
+        self.errors = []
+        self.preview = []
+
+    def add_error(self, line, sku, message):
+        self.errors.append({'line': line, 'sku': sku, 'error': str(message)})
+
+    def write_errors(self, stream):
+        writer = csv.DictWriter(stream, fieldnames=['line', 'sku', 'error'])
+        writer.writeheader()
+        writer.writerows(self.errors)
+
+
+def find_attribute_conflicts(rows):
+    """
+    Find rows that would give a product two variants with the same attributes,
+    which the (product, attribute signature) unique constraint would reject for
+    the whole statement. ``rows`` are dicts with ``sku``, ``product_id`` and ``attributes``;
+    returns ``{sku: sku of the variant already holding those attributes}``.
+    """
+    taken = {
+        (product_id, signature): sku
+        for product_id, signature, sku in ProductVariant.objects.filter(
+            product_id__in={row['product_id'] for row in rows}
+        ).exclude(
+            sku__in=[row['sku'] for row in rows]
+        ).values_list('product_id', 'attribute_signature', 'sku')
+    }
+
+    conflicts = {}
+    for row in rows:
+        key = (row['product_id'], attributes_signature(row['attributes']))
+        if key in taken:
+            conflicts[row['sku']] = taken[key]
+        else:
+            taken[key] = row['sku']
+    return conflicts
+
+
+VARIANT_UPSERT_FIELDS = ['product_id', 'attributes', 'price_adjustment', 'stock_quantity', 'is_active']
+
+
+def upsert_variants(items, user=None, note='Bulk update'):
+    """
+    Create or update variants keyed by SKU with set-based queries.
+
+    Each item holds a ``sku`` and any of ``product_id``, ``attributes``,
+    ``price_adjustment``, ``stock_quantity`` and ``is_active``; fields left out
+    keep their current value, so ``{'sku': ..., 'stock_quantity': ...}`` sets
+    stock. New SKUs need a product and attributes. Changed stock levels get one
+    StockHistory row each.
+
+    Returns ``(variants, errors)``. Nothing is written when any item is invalid;
+    ``errors`` then lists ``{'index', 'sku', 'error'}`` entries. Must run inside
+    a transaction, existing rows are locked while they are merged.
+    """
+    skus = [item['sku'] for item in items]
+    existing = {
+        row['sku']: row
+        for row in ProductVariant.objects.select_for_update().filter(sku__in=skus).values(
+            'sku', *VARIANT_UPSERT_FIELDS
+        )
+    }
+    product_ids = {item['product_id'] for item in items if item.get('product_id')}
+    product_ids.update(row['product_id'] for row in existing.values())
+    products = {
+        pk: (base_price, is_active)
+        for pk, base_price, is_active in Product.objects.filter(pk__in=product_ids).values_list(
+            'pk', 'base_price', 'is_active'
+        )
+    }
+
+    rows = []
+    errors = []
+    for index, item in enumerate(items):
+        current = existing.get(item['sku'])
+        row = dict(current or {
+            'sku': item['sku'],
+            'product_id': None,
+            'attributes': None,
+            'price_adjustment': Decimal('0.00'),
+            'stock_quantity': 0,
+            'is_active': True,
+        })
+        row.update((name, item[name]) for name in VARIANT_UPSERT_FIELDS if item.get(name) is not None)
+
+        if row['product_id'] not in products:
+            error = 'Product does not exist' if row['product_id'] else 'product is required for new variants'
+        elif row['attributes'] is None:
+            error = 'attributes are required for new variants'
+        elif current is None and not products[row['product_id']][1]:
+            error = 'Cannot create variant for inactive product'
+        elif row['price_adjustment'] < 0 and abs(row['price_adjustment']) > products[row['product_id']][0]:
+            error = 'Price adjustment cannot exceed base price'
+        else:
+            rows.append(row)
+            continue
+        errors.append({'index': index, 'sku': item['sku'], 'error': error})
+
+    conflicts = find_attribute_conflicts(rows) if not errors else {}
+    for index, item in enumerate(items):
+        if item['sku'] in conflicts:
+            errors.append({
+                'index': index,
+                'sku': item['sku'],
+                'error': f"Variant {conflicts[item['sku']]} already has these attributes",
+            })
+    if errors:
+        return [], sorted(errors, key=lambda error: error['index'])
+
+    now = timezone.now()
+    # bulk_create skips save(), which keeps the signature in step with the attributes
+    variants = ProductVariant.objects.bulk_create(
+        [
+            ProductVariant(
+                created_at=now,
+                updated_at=now,
+                attribute_signature=attributes_signature(row['attributes']),
+                **row
+            )
+            for row in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['sku'],
+        update_fields=VARIANT_UPSERT_FIELDS + ['attribute_signature', 'updated_at']
+    )
+
+    history = []
+    for variant in variants:
+        old_quantity = existing[variant.sku]['stock_quantity'] if variant.sku in existing else 0
+        if variant.stock_quantity != old_quantity:
+            history.append(StockHistory(
+                variant=variant,
+                user=user,
+                old_quantity=old_quantity,
+                new_quantity=variant.stock_quantity,
+                change_amount=variant.stock_quantity - old_quantity,
+                note=note
+            ))
+    StockHistory.objects.bulk_create(history)
+
+    product_ids = {row['product_id'] for row in rows}
+    product_ids.update(row['product_id'] for row in existing.values())
+    schedule_product_refresh(*product_ids)
+    recount_product_categories(product_ids)
+    return variants, []
+
+
+def iter_rows(stream, file_format='csv'):
+    """
+    Yield ``(line, row)`` pairs from a binary stream without reading it whole.
+    ``file_format`` is ``'csv'`` or ``'ndjson'``.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if file_format == 'ndjson':
+            for line, raw in enumerate(text, start=1):
+                if not raw.strip():
+                    continue
+                try:
+                    row = json.loads(raw)
+                except ValueError as e:
+                    yield line, RowError(f'Invalid JSON: {e}')
+                    continue
+                yield line, row if isinstance(row, dict) else RowError('Expected a JSON object')
+        else:
+            reader = csv.DictReader(text)
+            missing = [name for name in REQUIRED_COLUMNS if name not in (reader.fieldnames or [])]
+            if missing:
+                raise RowError(f"Missing required columns: {', '.join(missing)}")
+            # Report the line a row starts on; quoted values may span several lines
+            line = reader.line_num + 1
+            for row in reader:
+                yield line, row
+                line = reader.line_num + 1
+    finally:
+        text.detach()
+
+
+def _text(row, name, max_length=None, required=False):
+    value = row.get(name)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'{name} is required')
+    if max_length and len(value) > max_length:
+        raise RowError(f'{name} is longer than {max_length} characters')
+    return value
+
+
+def _decimal(row, name, default=None):
+    value = row.get(name)
+    if value is None or str(value).strip() == '':
+        if default is None:
+            raise RowError(f'{name} is required')
+        return default
+    try:
+        value = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise RowError(f'{name} is not a valid decimal: {value!r}')
+    if not value.is_finite() or value.as_tuple().exponent < -2 or abs(value) >= Decimal('1e8'):
+        raise RowError(f'{name} must have at most 8 digits and 2 decimal places')
+    return value
+
+
+def _integer(row, name, default=0):
+    value = row.get(name)
+    if value is None or str(value).strip() == '':
+        return default
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise RowError(f'{name} is not a valid integer: {value!r}')
+
+
+def _boolean(row, name, default=True):
+    value = row.get(name)
+    if isinstance(value, bool):
+        return value
+    value = '' if value is None else str(value).strip().lower()
+    if not value:
+        return default
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError(f'{name} is not a valid boolean: {value!r}')
+
+
+def _attributes(row):
+    value = row.get('attributes')
+    if value is None or value == '':
+        return {}
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise RowError('attributes must be a JSON object')
+    if not isinstance(value, dict):
+        raise RowError('attributes must be a JSON object')
+    return value
+
+
+class CatalogImporter:
+    """
+    Import products, variants and stock levels from a CSV or NDJSON stream.
+
+    ``default_category`` is used for rows without a ``category`` column (which
+    may hold a category id or slug). Each batch commits on its own, so a failure
+    late in a large file keeps the batches already imported.
+    """
+
+    def __init__(self, default_category=None, user=None, batch_size=IMPORT_BATCH_SIZE,
+                 preview_size=20):
+        self.default_category = default_category
+        self.user = user
+        self.batch_size = batch_size
+        self.preview_size = preview_size
+        self.categories = {}
+        for category in Category.objects.only('id', 'slug', 'name', 'is_active'):
+            self.categories[str(category.pk)] = category
+            self.categories[category.slug] = category
+
+    def run(self, stream, file_format='csv'):
+        result = ImportResult()
+        batch = []
+        for line, row in iter_rows(stream, file_format):
+            result.rows += 1
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch, result)
+                batch = []
+        if batch:
+            self.import_batch(batch, result)
+
+        logger.info(
+            f'Catalog import: {result.imported}/{result.rows} rows imported, '
+            f'{len(result.errors)} errors'
+        )
+        return result
+
+    def clean_row(self, row):
+        """Validate a raw row and return the product and variant values it holds."""
+        if isinstance(row, RowError):
+            raise row
+
+        name = _text(row, 'name', 200, required=True)
+        slug = _text(row, 'slug', 50) or slugify(name)[:50]
+        if not slug:
+            raise RowError('slug is required when it can\'t be derived from the name')
+        if slugify(slug) != slug:
+            raise RowError(f'Invalid slug: {slug!r}')
+
+        category_key = _text(row, 'category')
+        category = self.categories.get(category_key) if category_key else self.default_category
+        if category is None:
+            raise RowError(f'Unknown category: {category_key!r}' if category_key else 'category is required')
+        if not category.is_active:
+            raise RowError('Cannot assign product to inactive category')
+
+        base_price = _decimal(row, 'base_price')
+        if base_price < Decimal('0.01'):
+            raise RowError('base_price must be at least 0.01')
+        price_adjustment = _decimal(row, 'price_adjustment', Decimal('0.00'))
+        if price_adjustment < 0 and abs(price_adjustment) > base_price:
+            raise RowError('Price adjustment cannot exceed base price')
+
+        stock_quantity = _integer(row, 'stock_quantity')
+        if stock_quantity < 0:
+            raise RowError('stock_quantity cannot be negative')
+
+        product = {
+            'slug': slug,
+            'name': name,
+            'description': _text(row, 'description', required=True),
+            'base_price': base_price,
+            'category_id': category.pk,
+            'meta_title': _text(row, 'meta_title', 150),
+            'meta_description': _text(row, 'meta_description'),
+        }
+        variant = {
+            'sku': _text(row, 'sku', 100, required=True),
+            'attributes': _attributes(row),
+            'price_adjustment': price_adjustment,
+            'stock_quantity': stock_quantity,
+            'is_active': _boolean(row, 'is_active'),
+        }
+        return product, variant
+
+    def import_batch(self, batch, result):
+        products = {}
+        variants = {}
+        for line, row in batch:
+            sku = row.get('sku') if isinstance(row, dict) else None
+            try:
+                product, variant = self.clean_row(row)
+            except RowError as e:
+                result.add_error(line, sku, e)
+                continue
+            if variant['sku'] in variants:
+                result.add_error(line, sku, f'Duplicate SKU in file (first seen on line {variants[variant["sku"]][0]})')
+                continue
+            # The last row of a product wins for product-level fields
+            products[product['slug']] = product
+            variants[variant['sku']] = (line, product['slug'], variant)
+
+        if not variants:
+            return
+
+        with transaction.atomic():
+            existing = list(Product.objects.filter(slug__in=products).values_list(
+                'slug', 'category_id', 'is_active'
+            ))
+            # Like ProductVariant.clean(), variants can't be added to or changed
+            # on an inactive product; its rows are rejected instead of reviving it
+            inactive = {slug for slug, category_id, is_active in existing if not is_active}
+            for sku, (line, slug, variant) in list(variants.items()):
+                if slug in inactive:
+                    result.add_error(line, sku, 'Cannot import variants for inactive product')
+                    del variants[sku]
+                    products.pop(slug, None)
+            if not variants:
+                return
+
+            # Products may move to another category
+            previous_categories = {category_id for slug, category_id, is_active in existing if is_active}
+            product_ids = self.upsert_products(products.values())
+            rows = self.check_attribute_conflicts(variants, product_ids, result)
+            affected = self.copy_variants(rows) if rows else []
+            # Every upserted product changed, even when all its variants were rejected
+            schedule_product_refresh(*product_ids.values(), *affected)
+            recount_product_categories([*product_ids.values(), *affected], previous_categories)
+            if rows:
+                result.imported += len(rows)
+                result.product_ids.update(row['product_id'] for row in rows)
+                for row in rows[:max(self.preview_size - len(result.preview), 0)]:
+                    product = products[row['slug']]
+                    result.preview.append({
+                        'name': product['name'],
+                        'sku': row['sku'],
+                        'base_price': product['base_price'],
+                        'category': self.categories[str(product['category_id'])].name,
+                    })
+
+    def upsert_products(self, products):
+        """Insert or update products by slug and return their ids by slug."""
+        now = timezone.now()
+        Product.objects.bulk_create(
+            [Product(created_at=now, updated_at=now, **product) for product in products],
+            update_conflicts=True,
+            unique_fields=['slug'],
+            update_fields=[
+                'name', 'description', 'base_price', 'category', 'meta_title',
+                'meta_description', 'updated_at'
+            ]
+        )
+        return dict(Product.objects.filter(
+            slug__in=[product['slug'] for product in products]
+        ).values_list('slug', 'pk'))
+
+    def check_attribute_conflicts(self, variants, product_ids, result):
+        """Drop and report rows that find_attribute_conflicts() rejects."""
+        rows = [
+            dict(variant, product_id=product_ids[slug], slug=slug, line=line)
+            for sku, (line, slug, variant) in variants.items()
+        ]
+        conflicts = find_attribute_conflicts(rows)
+        for row in rows:
+            if row['sku'] in conflicts:
+                result.add_error(row['line'], row['sku'], f"Variant {conflicts[row['sku']]} already has these attributes")
+        return [row for row in rows if row['sku'] not in conflicts]
+
+    def copy_variants(self, rows):
+        """
+        Stage variant rows with COPY and merge them into the variant table in one
+        statement, recording stock history for changed quantities. Returns the ids
+        of every product that gained, lost or changed a variant.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                row['sku'],
+                row['product_id'],
+                json.dumps(row['attributes']),
+                attributes_signature(row['attributes']),
+                row['price_adjustment'],
+                row['stock_quantity'],
+                't' if row['is_active'] else 'f',
+            ])
+        buffer.seek(0)
+
+        variant_table = connection.ops.quote_name(ProductVariant._meta.db_table)
+        history_table = connection.ops.quote_name(StockHistory._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (
+                    sku varchar(100) PRIMARY KEY,
+                    product_id bigint NOT NULL,
+                    attributes jsonb NOT NULL,
+                    attribute_signature varchar(32) NOT NULL,
+                    price_adjustment numeric(10, 2) NOT NULL,
+                    stock_quantity integer NOT NULL,
+                    is_active boolean NOT NULL
+                ) ON COMMIT DROP
+            """)
+            cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+            cursor.execute(f"""
+                WITH previous AS (
+                    SELECT v.id, v.sku, v.product_id, v.stock_quantity
+                    FROM {variant_table} v
+                    JOIN {STAGING_TABLE} s ON s.sku = v.sku
+                    FOR UPDATE OF v
+                ),
+                upserted AS (
+                    INSERT INTO {variant_table} (
+                        sku, product_id, attributes, attribute_signature, price_adjustment,
+                        stock_quantity, is_active, created_at, updated_at
+                    )
+                    SELECT sku, product_id, attributes, attribute_signature, price_adjustment,
+                           stock_quantity, is_active, %(now)s, %(now)s
+                    FROM {STAGING_TABLE}
+                    ON CONFLICT (sku) DO UPDATE SET
+                        product_id = EXCLUDED.product_id,
+                        attributes = EXCLUDED.attributes,
+                        attribute_signature = EXCLUDED.attribute_signature,
+                        price_adjustment = EXCLUDED.price_adjustment,
+                        stock_quantity = EXCLUDED.stock_quantity,
+                        is_active = EXCLUDED.is_active,
+                        updated_at = EXCLUDED.updated_at
+                    RETURNING id, sku, product_id, stock_quantity
+                ),
+                history AS (
+                    INSERT INTO {history_table} (
+                        variant_id, user_id, old_quantity, new_quantity, change_amount,
+                        note, is_active, created_at, updated_at
+                    )
+                    SELECT u.id, %(user)s, COALESCE(p.stock_quantity, 0), u.stock_quantity,
+                           u.stock_quantity - COALESCE(p.stock_quantity, 0), %(note)s,
+                           true, %(now)s, %(now)s
+                    FROM upserted u
+                    LEFT JOIN previous p ON p.sku = u.sku
+                    WHERE u.stock_quantity <> COALESCE(p.stock_quantity, 0)
+                )
+                SELECT product_id FROM upserted
+                UNION
+                SELECT product_id FROM previous
+            """, {
+                'now': timezone.now(),
+                'user': self.user.pk if self.user else None,
+                'note': 'Catalog import',
+            })
+            return [product_id for product_id, in cursor.fetchall()]
+
+
+def write_template(stream):
+    """Write an example import file with every supported column."""
+    writer = csv.writer(stream)
+    writer.writerow(IMPORT_COLUMNS)
+    writer.writerow([
+        'TSHIRT-BLK-M', 'Basic T-shirt', 'basic-t-shirt', 'Cotton crew neck t-shirt',
+        '19.99', '', '0.00', '25', '{"size": "M", "color": "Black"}', 'true', '', '',
+    ])
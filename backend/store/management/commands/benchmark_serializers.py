@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+import time
+
+from store.catalog import get_card_queryset
+from store.models import Product, Order
+from store.prefetch import plan_queryset
+from store.serializers import ProductCardSerializer, OrderResponseSerializer
+from store.serializers.compiled import compile_products, compile_orders
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the compiled serializers against the DRF serializers on a page of '
+        'products and orders; their output is checked by store/tests/test_compiled.py'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=20, help='Objects per page')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per serializer')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        repeat = options['repeat']
+        product_ids = list(Product.objects.order_by('-created_at', '-id').values_list('pk', flat=True)[:page_size])
+        order_ids = list(Order.objects.order_by('-created_at', '-id').values_list('pk', flat=True)[:page_size])
+
+        # The querysets the production DRF paths use
+        products = get_card_queryset()
+        orders = plan_queryset(Order.objects.select_related('user'), OrderResponseSerializer)
+
+        def drf_products():
+            return ProductCardSerializer(products.filter(pk__in=product_ids), many=True).data
+
+        def compiled_products():
+            return compile_products(product_ids, card=True)
+
+        def drf_orders():
+            return OrderResponseSerializer(orders.filter(pk__in=order_ids), many=True).data
+
+        def compiled_orders():
+            return compile_orders(order_ids)
+
+        for name, count, reference, compiled in [
+            ('products', len(product_ids), drf_products, compiled_products),
+            ('orders', len(order_ids), drf_orders, compiled_orders),
+        ]:
+            drf_time = self._time(reference, repeat)
+            compiled_time = self._time(compiled, repeat)
+            speedup = drf_time / compiled_time if compiled_time else float('inf')
+            self.stdout.write(
+                f'{name}: {count} objects, serializer {drf_time * 1000:.1f} ms, '
+                f'compiled {compiled_time * 1000:.1f} ms, {speedup:.1f}x faster'
+            )
+
+    def _time(self, build, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            build()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.exporters import CatalogExporter, EXPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Stream the active catalog (variants, prices, stock, images) to a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='File to write (standard output by default)')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'ndjson'],
+            help='File format (detected from the extension by default, csv for standard output)'
+        )
+        parser.add_argument(
+            '--base-url',
+            default='',
+            help='Prefix for relative image URLs, e.g. https://shop.example.com'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Number of rows fetched from the database cursor at a time'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'ndjson' if path and path.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+        )
+        exporter = CatalogExporter(base_url=options['base_url'], chunk_size=options['chunk_size'])
+
+        if not path:
+            exporter.export(self.stdout, file_format)
+            return
+        try:
+            with open(path, 'w', newline='', encoding='utf-8') as stream:
+                exporter.export(stream, file_format)
+        except OSError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Exported the catalog to {path}'))
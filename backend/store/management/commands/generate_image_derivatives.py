@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from store.images import generate_derivatives, needs_derivatives
+from store.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/AVIF derivatives for product images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate derivatives for every image, not only those missing them'
+        )
+
+    def handle(self, *args, **options):
+        force = options['all']
+        images = ProductImage.objects.exclude(image='').only('id', 'image', 'derivatives')
+        image_ids = [image.pk for image in images.iterator() if force or needs_derivatives(image)]
+
+        def generate(image_id):
+            try:
+                return generate_derivatives(image_id, force=force)
+            finally:
+                # Each worker thread opens its own connection
+                connection.close()
+
+        # Threads overlap storage I/O while the process pool does the encoding
+        with ThreadPoolExecutor(max_workers=settings.STORE_IMAGE_WORKERS) as executor:
+            results = list(executor.map(generate, image_ids))
+
+        generated = sum(1 for result in results if result is not None)
+        self.stdout.write(self.style.SUCCESS(f'Generated derivatives for {generated} of {len(image_ids)} images'))
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.importers import CatalogImporter, RowError, IMPORT_BATCH_SIZE
+from store.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products, variants and stock from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'ndjson'],
+            help='File format (detected from the extension by default)'
+        )
+        parser.add_argument(
+            '--category',
+            help='Id or slug of the category used for rows without a category column'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Number of rows validated and written per batch'
+        )
+        parser.add_argument('--errors', help='Write the per-row error report to this CSV file')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'ndjson' if path.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+        )
+
+        category = None
+        if options['category']:
+            key = options['category']
+            lookup = {'pk': key} if key.isdigit() else {'slug': key}
+            category = Category.objects.filter(**lookup).first()
+            if category is None:
+                raise CommandError(f'Category {key!r} does not exist')
+
+        importer = CatalogImporter(default_category=category, batch_size=options['batch_size'])
+        try:
+            with open(path, 'rb') as stream:
+                result = importer.run(stream, file_format)
+        except (OSError, RowError) as e:
+            raise CommandError(str(e))
+
+        if options['errors']:
+            with open(options['errors'], 'w', newline='', encoding='utf-8') as report:
+                result.write_errors(report)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.imported} of {result.rows} rows into {len(result.product_ids)} products'
+        ))
+        if result.errors:
+            self.stdout.write(self.style.WARNING(f'{len(result.errors)} rows were skipped'))
+            for error in result.errors[:20]:
+                self.stdout.write(f"  line {error['line']} ({error['sku'] or '-'}): {error['error']}")
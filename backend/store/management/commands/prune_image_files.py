@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.images import prune_image_files
+
+
+class Command(BaseCommand):
+    help = 'Delete stored product image files that no image references any more; run periodically'
+
+    def handle(self, *args, **options):
+        deleted = prune_image_files()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unreferenced image files'))
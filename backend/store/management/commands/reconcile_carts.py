@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.models import Cart
+
+
+class Command(BaseCommand):
+    help = 'Recompute cart totals from their items and correct the ones that drifted; run periodically'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'cart_ids', nargs='*', type=int,
+            help='Carts to reconcile (default: all active carts)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            corrected = Cart.reconcile_totals(options['cart_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Corrected the totals of {corrected} carts'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.counters import recount_categories
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-category product and in-stock variant counters from scratch'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount_categories()
+        self.stdout.write(self.style.SUCCESS('Recounted all categories'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from store.catalog import refresh_products, CARD_BATCH_SIZE
+from store.models import Category, Product, ProductVariant
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild denormalized catalog data (category paths, variant attribute '
+        'signatures, product cards and search vectors)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=CARD_BATCH_SIZE,
+            help='Number of products refreshed per batch'
+        )
+
+    def handle(self, *args, **options):
+        categories = Category.rebuild_paths()
+        self.stdout.write(f'Rebuilt paths of {categories} categories')
+
+        signatures, duplicates = ProductVariant.refresh_attribute_signatures()
+        self.stdout.write(f'Updated attribute signatures of {signatures} variants')
+        if duplicates:
+            self.stdout.write(self.style.WARNING(
+                f'{len(duplicates)} variants repeat the attributes of another variant of '
+                f'their product and were left without a signature: {duplicates}'
+            ))
+
+        batch_size = options['batch_size']
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+
+        total = 0
+        for start in range(0, len(product_ids), batch_size):
+            total += len(refresh_products(product_ids[start:start + batch_size]))
+
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {total} products'))
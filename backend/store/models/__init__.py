@@ -5,7 +5,9 @@ from .product import (
     ProductAttribute,
     ProductVariant,
     ProductImage,
-    StockHistory
+    StockHistory,
+    ProductCard,
+    attributes_signature
 )
 from .cart import Cart, CartItem
 from .order import Order, OrderItem
@@ -26,6 +28,8 @@ __all__ = [
     'ProductVariant',
     'ProductImage',
     'StockHistory',
+    'ProductCard',
+    'attributes_signature',
     
     # Cart
     'Cart',
@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.db import transaction
 from decimal import Decimal
@@ -12,7 +15,19 @@ from users.models import User
 logger = logging.getLogger(__name__)
 
 class Cart(BaseModel):
-    """Shopping cart model."""
+    """
+    Shopping cart model.
+
+    The totals are kept up to date incrementally: every CartItem save or delete
+    adds its difference with one UPDATE in the same transaction, instead of
+    re-summing the items. Each item remembers the unit price the total includes,
+    so removing it subtracts exactly what was added. ``reconcile_totals``, run
+    periodically by the ``reconcile_carts`` command, re-prices items at current
+    prices and corrects changes that bypass CartItem (bulk and cascade deletes).
+    """
+    # Maintained by CartItem.save() and delete(), never written by forms
+    TOTAL_FIELDS = ('total_amount', 'total_items', 'item_count')
+
     user = models.ForeignKey(
         User,
         verbose_name=_('User'),
@@ -25,6 +40,18 @@ class Cart(BaseModel):
         decimal_places=2,
         default=Decimal('0.00')
     )
+    total_items = models.PositiveIntegerField(
+        _('Total items'),
+        default=0,
+        editable=False,
+        help_text=_('Number of distinct items in the cart')
+    )
+    item_count = models.PositiveIntegerField(
+        _('Item count'),
+        default=0,
+        editable=False,
+        help_text=_('Total quantity of all items in the cart')
+    )
 
     class Meta:
         verbose_name = _('Cart')
@@ -33,22 +60,83 @@ class Cart(BaseModel):
             models.Index(fields=['user', 'is_active']),
         ]
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # The totals change through F() updates (see add_totals); don't
+            # write back a stale copy over them
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.TOTAL_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def add_totals(self, amount=Decimal('0.00'), items=0, quantity=0):
+        """Add the given differences to the stored totals with one UPDATE."""
+        if not (amount or items or quantity):
+            return
+        now = timezone.now()
+        Cart.objects.filter(pk=self.pk).update(
+            total_amount=F('total_amount') + amount,
+            total_items=F('total_items') + items,
+            item_count=F('item_count') + quantity,
+            updated_at=now
+        )
+        self.total_amount += amount
+        self.total_items += items
+        self.item_count += quantity
+        self.updated_at = now
+
     def calculate_total(self):
-        """Calculate the total amount for all items in the cart."""
-        total = sum(item.total_price for item in self.items.all())
-        self.total_amount = total
-        self.save(update_fields=['total_amount', 'updated_at'])
-        return total
+        """Recompute the totals of this cart from its items at current prices."""
+        Cart.reconcile_totals([self.pk])
+        self.refresh_from_db(fields=[*self.TOTAL_FIELDS, 'updated_at'])
+        return self.total_amount
 
-    @property
-    def total_items(self):
-        """Get the total number of unique items in the cart."""
-        return self.items.count()
+    @classmethod
+    def reconcile_totals(cls, cart_ids=None):
+        """
+        Re-price the items of the given carts (all active ones when None) at
+        current prices and recompute their totals, writing only the carts that
+        changed. Returns the number of carts corrected.
+        """
+        carts = cls.objects.filter(is_active=True) if cart_ids is None else cls.objects.filter(pk__in=cart_ids)
 
-    @property
-    def item_count(self):
-        """Get the total quantity of all items in the cart."""
-        return sum(item.quantity for item in self.items.all())
+        price = ProductVariant.objects.filter(pk=OuterRef('variant_id')).order_by().annotate(
+            price=F('product__base_price') + F('price_adjustment')
+        ).values('price')
+        CartItem.objects.filter(cart__in=carts).exclude(unit_price=Subquery(price)).update(
+            unit_price=Subquery(price)
+        )
+
+        items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+
+        def total(expression, output_field, zero):
+            return Coalesce(
+                Subquery(items.annotate(total=Sum(expression)).values('total'), output_field=output_field),
+                Value(zero)
+            )
+
+        amount = total(
+            F('quantity') * F('unit_price'),
+            DecimalField(max_digits=10, decimal_places=2),
+            Decimal('0.00')
+        )
+        count = total(Value(1), IntegerField(), 0)
+        quantity = total(F('quantity'), IntegerField(), 0)
+        return carts.annotate(
+            expected_amount=amount,
+            expected_items=count,
+            expected_quantity=quantity
+        ).exclude(
+            total_amount=F('expected_amount'),
+            total_items=F('expected_items'),
+            item_count=F('expected_quantity')
+        ).update(
+            total_amount=amount,
+            total_items=count,
+            item_count=quantity,
+            updated_at=timezone.now()
+        )
 
     @transaction.atomic
     def add_item(self, variant, quantity=1):
@@ -76,7 +164,6 @@ class Cart(BaseModel):
                 raise ValidationError(_("Requested quantity exceeds available stock"))
             cart_item.save()
 
-        self.calculate_total()
         logger.info(f"Added {quantity} of {variant.sku} to cart {self.id}")
         return cart_item
 
@@ -87,10 +174,9 @@ class Cart(BaseModel):
             raise ValidationError(_("Cannot update items in inactive cart"))
 
         try:
-            cart_item = self.items.get(variant=variant)
+            cart_item = self.items.select_related('variant__product').get(variant=variant)
             if quantity <= 0:
                 cart_item.delete()
-                self.calculate_total()
                 logger.info(f"Removed {variant.sku} from cart {self.id}")
                 return None
             
@@ -102,7 +188,6 @@ class Cart(BaseModel):
             
             cart_item.quantity = quantity
             cart_item.save()
-            self.calculate_total()
             logger.info(f"Updated {variant.sku} quantity to {quantity} in cart {self.id}")
             return cart_item
         except CartItem.DoesNotExist:
@@ -115,7 +200,9 @@ class Cart(BaseModel):
         """Remove all items from the cart."""
         self.items.all().delete()
         self.total_amount = Decimal('0.00')
-        self.save(update_fields=['total_amount', 'updated_at'])
+        self.total_items = 0
+        self.item_count = 0
+        self.save(update_fields=[*self.TOTAL_FIELDS, 'updated_at'])
         logger.info(f"Cleared cart {self.id}")
 
     def __str__(self):
@@ -139,6 +226,14 @@ class CartItem(BaseModel):
         _('Quantity'),
         default=1
     )
+    unit_price = models.DecimalField(
+        _('Unit price'),
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text=_('Price per unit the cart total currently includes')
+    )
 
     class Meta:
         verbose_name = _('Cart Item')
@@ -171,19 +266,55 @@ class CartItem(BaseModel):
             raise ValidationError({'quantity': _("Requested quantity exceeds available stock")
         })
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What the cart totals include for this item, see count_change()
+        instance._counted_state = (instance.__dict__.get('quantity'), instance.__dict__.get('unit_price'))
+        return instance
+
+    def get_counted_state(self):
+        """``(quantity, unit_price)`` the cart totals include, or None for new items."""
+        if self._state.adding:
+            return None
+        state = getattr(self, '_counted_state', None)
+        if state is None or None in state:
+            state = CartItem.objects.filter(pk=self.pk).values_list('quantity', 'unit_price').first()
+        return state
+
+    def count_change(self, old, new):
+        """Add the difference between two counted states to the cart totals."""
+        if old == new:
+            return
+        amount, items, quantity = Decimal('0.00'), 0, 0
+        for state, sign in ((old, -1), (new, 1)):
+            if state is not None:
+                amount += sign * state[1] * state[0]
+                items += sign
+                quantity += sign * state[0]
+        self.cart.add_totals(amount, items, quantity)
+        self._counted_state = new
+
+    @transaction.atomic
     def save(self, *args, **kwargs):
-        """Save the cart item with validation."""
+        """Save the cart item with validation and update the cart totals."""
         self.full_clean()
+        previous = self.get_counted_state()
+        # Saving re-prices the item at the variant's current price
+        self.unit_price = self.variant.final_price
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'unit_price' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'unit_price']
         super().save(*args, **kwargs)
-        if self.cart:
-            self.cart.calculate_total()
+        self.count_change(previous, (self.quantity, self.unit_price))
 
+    @transaction.atomic
     def delete(self, *args, **kwargs):
-        """Delete the cart item and update cart total."""
-        cart = self.cart
-        super().delete(*args, **kwargs)
-        if cart:
-            cart.calculate_total()
+        """Delete the cart item and update the cart totals."""
+        previous = self.get_counted_state()
+        result = super().delete(*args, **kwargs)
+        self.count_change(previous, None)
+        return result
 
     def __str__(self):
         return f"{self.quantity}x {self.variant.product.name} ({self.variant.sku})"
\ No newline at end of file
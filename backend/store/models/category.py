@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import connection, models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
@@ -7,7 +10,14 @@ from .base import BaseModel
 class Category(BaseModel):
     """
     Category model for organizing products in a hierarchical structure.
+
+    The hierarchy is also stored as a materialized path of primary keys,
+    ``/1/5/12/`` for category 12 under 5 under the root 1, so ancestors,
+    descendants and subtree products each take one indexed query.
     """
+    # Maintained by store.counters, never written by save()
+    COUNTER_FIELDS = ('product_count', 'variant_count', 'subtree_product_count', 'subtree_variant_count')
+
     name = models.CharField(_('Name'), max_length=100)
     slug = models.SlugField(_('Slug'), unique=True)
     description = models.TextField(_('Description'), blank=True)
@@ -19,6 +29,42 @@ class Category(BaseModel):
         on_delete=models.CASCADE,
         related_name='children'
     )
+    path = models.CharField(
+        _('Path'),
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text=_('Primary keys from the root down to this category, e.g. /1/5/12/')
+    )
+    depth = models.PositiveSmallIntegerField(_('Depth'), default=0, editable=False)
+    product_count = models.PositiveIntegerField(
+        _('Products'),
+        default=0,
+        editable=False,
+        help_text=_('Active products in this category')
+    )
+    variant_count = models.PositiveIntegerField(
+        _('Variants in stock'),
+        default=0,
+        editable=False,
+        help_text=_('Active, in-stock variants of active products in this category')
+    )
+    subtree_product_count = models.PositiveIntegerField(
+        _('Products incl. subcategories'),
+        default=0,
+        editable=False
+    )
+    subtree_variant_count = models.PositiveIntegerField(
+        _('Variants in stock incl. subcategories'),
+        default=0,
+        editable=False
+    )
+    version = models.PositiveIntegerField(
+        _('Version'),
+        default=1,
+        editable=False,
+        help_text=_('Incremented whenever the object or anything it embeds changes')
+    )
 
     class Meta:
         verbose_name = _('Category')
@@ -26,6 +72,9 @@ class Category(BaseModel):
         indexes = [
             models.Index(fields=['slug']),
             models.Index(fields=['is_active']),
+            # Serves the path LIKE 'prefix%' subtree lookups regardless of collation
+            models.Index(fields=['path'], opclasses=['varchar_pattern_ops'], name='store_category_path'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='store_category_name_trgm'),
         ]
         ordering = ['name']
 
@@ -34,22 +83,23 @@ class Category(BaseModel):
             return f"{self.parent.name} > {self.name}"
         return self.name
 
+    @property
+    def ancestor_ids(self):
+        """Primary keys of the ancestors, root first."""
+        return [int(pk) for pk in self.path.strip('/').split('/')[:-1]] if self.path else []
+
     def get_ancestors(self):
         """Get all parent categories up to the root."""
-        ancestors = []
-        current = self.parent
-        while current:
-            ancestors.append(current)
-            current = current.parent
-        return ancestors[::-1]
+        if not self.path and self.parent_id:
+            # A new category's path is only stored after its insert
+            return self.parent.get_ancestors() + [self.parent]
+        return list(Category.objects.filter(pk__in=self.ancestor_ids).order_by('depth'))
 
     def get_descendants(self):
-        """Get all subcategories recursively."""
-        descendants = []
-        for child in self.children.all():
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
-        return descendants
+        """Get all subcategories at any depth, ordered depth-first."""
+        if not self.path:
+            return Category.objects.none()
+        return Category.objects.filter(path__startswith=self.path).exclude(pk=self.pk).order_by('path')
 
     @property
     def full_name(self):
@@ -61,13 +111,82 @@ class Category(BaseModel):
 
     def clean(self):
         """Ensure a category cannot be its own parent or child."""
-        if self.parent == self:
+        if self.parent_id and self.parent_id == self.pk:
             raise ValidationError(_("A category cannot be its own parent."))
-        if self.pk:
-            if self in self.get_descendants():
-                raise ValidationError(_("A category cannot be a parent of itself."))
+        if self.pk and self.parent_id and f'/{self.pk}/' in self.parent.path:
+            raise ValidationError(_("A category cannot be a parent of itself."))
 
     def save(self, *args, **kwargs):
-        """Save the category with validation."""
+        """Save the category with validation, keeping the subtree's paths current."""
         self.full_clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        if self.pk is None:
+            # The path ends with the primary key, which the insert assigns
+            super().save(*args, **kwargs)
+            self.path, self.depth = self.get_path()
+            Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+            return
+
+        if kwargs.get('update_fields') is None:
+            # The version and the counters change through F() updates (see
+            # store.signals and store.counters); don't write back a stale copy
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('version', *self.COUNTER_FIELDS)
+            ]
+        # store.signals refreshes the ancestors the category is moved away from too
+        self._previous_ancestor_ids = self.ancestor_ids
+        path, depth = self.get_path()
+        if path != self.path:
+            self.move_subtree(path, depth)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'path', 'depth'}
+        super().save(*args, **kwargs)
+
+    def get_path(self):
+        """Path and depth of the category under its current parent."""
+        if self.parent_id:
+            return f'{self.parent.path}{self.pk}/', self.parent.depth + 1
+        return f'/{self.pk}/', 0
+
+    def move_subtree(self, path, depth):
+        """
+        Rewrite the path and depth of this category and everything below it in
+        one UPDATE, and move its subtree counters to the new ancestors.
+        """
+        if self.path:
+            Category.objects.filter(path__startswith=self.path).update(
+                path=Concat(Value(path), Substr('path', len(self.path) + 1)),
+                depth=F('depth') + (depth - self.depth)
+            )
+            # Move the subtree's totals from the old ancestors to the new ones
+            products, variants = Category.objects.filter(pk=self.pk).values_list(
+                'subtree_product_count', 'subtree_variant_count'
+            ).get()
+            for ancestors, sign in ((self.path, -1), (path, 1)):
+                Category.objects.filter(pk__in=ancestors.strip('/').split('/')[:-1]).update(
+                    subtree_product_count=F('subtree_product_count') + sign * products,
+                    subtree_variant_count=F('subtree_variant_count') + sign * variants
+                )
+        self.path, self.depth = path, depth
+
+    @classmethod
+    def rebuild_paths(cls):
+        """Recompute every path and depth from the parent links in one statement."""
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                WITH RECURSIVE tree (id, path, depth) AS (
+                    SELECT id, '/' || id || '/', 0
+                    FROM {table}
+                    WHERE parent_id IS NULL
+                    UNION ALL
+                    SELECT category.id, tree.path || category.id || '/', tree.depth + 1
+                    FROM {table} AS category
+                    JOIN tree ON category.parent_id = tree.id
+                )
+                UPDATE {table} SET path = tree.path, depth = tree.depth
+                FROM tree
+                WHERE {table}.id = tree.id
+            """)
+            return cursor.rowcount
@@ -185,6 +185,7 @@ class OrderItem(BaseModel):
     class Meta:
         verbose_name = _('Order Item')
         verbose_name_plural = _('Order Items')
+        ordering = ['id']
         indexes = [
             models.Index(fields=['order', 'variant']),
         ]
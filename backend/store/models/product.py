@@ -3,12 +3,20 @@ from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
 from decimal import Decimal
 from django.conf import settings
 from django.db import transaction
+import hashlib
+import json
+
+from django_cleanup import cleanup
 
 from .base import BaseModel
 from .category import Category
+from ..storage import ContentAddressedStorage
 
 class ProductAttribute(BaseModel):
     """Model for defining product attributes like size, color, etc."""
@@ -45,6 +53,29 @@ class Product(BaseModel):
     )
     meta_title = models.CharField(_('Meta title'), max_length=150, blank=True)
     meta_description = models.TextField(_('Meta description'), blank=True)
+    min_final_price = models.DecimalField(
+        _('Minimum final price'),
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        help_text=_('Lowest final price among active variants, maintained automatically')
+    )
+    max_final_price = models.DecimalField(
+        _('Maximum final price'),
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        help_text=_('Highest final price among active variants, maintained automatically')
+    )
+    search_vector = SearchVectorField(_('Search vector'), null=True, editable=False)
+    version = models.PositiveIntegerField(
+        _('Version'),
+        default=1,
+        editable=False,
+        help_text=_('Incremented whenever the object or anything it embeds changes')
+    )
 
     class Meta:
         verbose_name = _('Product')
@@ -53,6 +84,11 @@ class Product(BaseModel):
             models.Index(fields=['slug']),
             models.Index(fields=['is_active']),
             models.Index(fields=['category', 'is_active']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['min_final_price', 'id']),
+            models.Index(fields=['max_final_price']),
+            GinIndex(fields=['search_vector'], name='store_product_search_gin'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='store_product_name_trgm'),
         ]
         ordering = ['-created_at']
 
@@ -79,6 +115,17 @@ class Product(BaseModel):
         """Get all active variants with stock."""
         return self.variants.filter(is_active=True, stock_quantity__gt=0)
 
+def attributes_signature(attributes):
+    """
+    Hash of a variant's attributes that doesn't depend on key order.
+
+    Names and values are compared exactly, the way the ``attr.`` filters'
+    containment lookups match them: ``{"size": "M"}`` and ``{"size": "m"}``,
+    or ``{"size": 1}`` and ``{"size": "1"}``, are different variants.
+    """
+    canonical = json.dumps(attributes or {}, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
 class ProductVariant(BaseModel):
     """Model for product variants (e.g., different sizes/colors)."""
     product = models.ForeignKey(
@@ -92,6 +139,15 @@ class ProductVariant(BaseModel):
         _('Attributes'),
         help_text=_('JSON object containing attribute values, e.g., {"size": "M", "color": "Red"}')
     )
+    # Nullable so the column and its unique constraint can be added to an
+    # existing table; refresh_catalog backfills the rows stored before it
+    attribute_signature = models.CharField(
+        _('Attribute signature'),
+        max_length=32,
+        null=True,
+        editable=False,
+        help_text=_('Hash of the attributes, unique per product')
+    )
     price_adjustment = models.DecimalField(
         _('Price adjustment'),
         max_digits=10,
@@ -108,12 +164,21 @@ class ProductVariant(BaseModel):
     class Meta:
         verbose_name = _('Product Variant')
         verbose_name_plural = _('Product Variants')
+        ordering = ['id']
         indexes = [
             models.Index(fields=['sku']),
             models.Index(fields=['is_active']),
             models.Index(fields=['product', 'is_active']),
+            GinIndex(fields=['sku'], opclasses=['gin_trgm_ops'], name='store_variant_sku_trgm'),
+            GinIndex(fields=['attributes'], opclasses=['jsonb_path_ops'], name='store_variant_attrs_gin'),
+        ]
+        constraints = [
+            # Also serves exact lookups of a product's variant by attributes
+            models.UniqueConstraint(
+                fields=['product', 'attribute_signature'],
+                name='store_variant_unique_attributes'
+            ),
         ]
-        unique_together = [['product', 'attributes']]
 
     def __str__(self):
         attrs = ', '.join(f"{k}: {v}" for k, v in self.attributes.items())
@@ -128,11 +193,55 @@ class ProductVariant(BaseModel):
         if not self.product.is_active:
             raise ValidationError(_("Cannot create variant for inactive product"))
 
+    def save(self, *args, **kwargs):
+        self.attribute_signature = attributes_signature(self.attributes)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'attributes' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'attribute_signature'}
+        super().save(*args, **kwargs)
+
     @property
     def final_price(self):
         """Calculate the final price including adjustments."""
         return self.product.base_price + self.price_adjustment
 
+    @classmethod
+    @transaction.atomic
+    def refresh_attribute_signatures(cls, batch_size=1000):
+        """
+        Recompute every variant's attribute signature, e.g. for rows stored
+        before the column existed. A variant repeating the attributes of an
+        older variant of the same product is left without a signature, which
+        the unique constraint would reject. Returns ``(updated, duplicate ids)``.
+        """
+        taken = set()
+        changed = []
+        duplicates = []
+        rows = cls.objects.order_by('product_id', 'pk').values_list(
+            'pk', 'product_id', 'attributes', 'attribute_signature'
+        )
+        for pk, product_id, attributes, current in rows.iterator(chunk_size=batch_size):
+            signature = attributes_signature(attributes)
+            if (product_id, signature) in taken:
+                duplicates.append(pk)
+                signature = None
+            else:
+                taken.add((product_id, signature))
+            if signature != current:
+                changed.append(cls(pk=pk, attribute_signature=signature))
+
+        # Clear the outdated signatures first, so a row taking over a value
+        # another row is about to give up can't trip the unique constraint
+        changed_ids = [variant.pk for variant in changed]
+        for start in range(0, len(changed_ids), batch_size):
+            cls.objects.filter(pk__in=changed_ids[start:start + batch_size]).update(attribute_signature=None)
+        cls.objects.bulk_update(
+            [variant for variant in changed if variant.attribute_signature is not None],
+            ['attribute_signature'],
+            batch_size=batch_size
+        )
+        return len(changed), duplicates
+
     @transaction.atomic
     def update_stock(self, quantity_change, user=None, note=None):
         """Update stock quantity with validation and history tracking."""
@@ -157,8 +266,14 @@ class ProductVariant(BaseModel):
 
         return new_quantity
 
+@cleanup.ignore
 class ProductImage(BaseModel):
-    """Model for product images."""
+    """
+    Model for product images.
+
+    Files are stored once per content and shared between images, so they are
+    released by the ``store.signals`` handlers rather than by django_cleanup.
+    """
     TYPES = (
         ('main', _('Main')),
         ('gallery', _('Gallery')),
@@ -181,7 +296,9 @@ class ProductImage(BaseModel):
     )
     image = models.ImageField(
         _('Image'),
-        upload_to='products/%Y/%m/%d'
+        upload_to='products',
+        storage=ContentAddressedStorage(),
+        db_index=True
     )
     alt_text = models.CharField(_('Alt text'), max_length=200)
     type = models.CharField(
@@ -191,6 +308,13 @@ class ProductImage(BaseModel):
         default='gallery'
     )
     order = models.IntegerField(_('Display order'), default=0)
+    derivatives = models.JSONField(
+        _('Derivatives'),
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text=_('Resized copies of the image by size and format, generated in the background')
+    )
 
     class Meta:
         verbose_name = _('Product Image')
@@ -200,7 +324,14 @@ class ProductImage(BaseModel):
             models.Index(fields=['product', 'type', 'is_active']),
             models.Index(fields=['variant', 'is_active']),
         ]
-        unique_together = [['product', 'type']] # Ensures only one main image per product
+        constraints = [
+            # Only one active main image per product; gallery and variant images are unlimited
+            models.UniqueConstraint(
+                fields=['product'],
+                condition=models.Q(type='main', is_active=True),
+                name='store_productimage_one_main'
+            ),
+        ]
 
     def clean(self):
         super().clean()
@@ -213,6 +344,13 @@ class ProductImage(BaseModel):
         ).exists():
             raise ValidationError(_("Product already has a main image"))
 
+    def get_derivative_url(self, size, fmt='webp'):
+        """URL of a generated derivative, or of the original until it exists."""
+        name = self.derivatives.get('sizes', {}).get(size, {}).get(fmt)
+        if name:
+            return self.image.storage.url(name)
+        return self.image.url
+
     def __str__(self):
         base = f"Image for {self.product.name}"
         if self.variant:
@@ -260,4 +398,26 @@ class StockHistory(BaseModel):
     @property
     def is_decrease(self):
         """Check if this was a stock decrease."""
-        return self.change_amount < 0
\ No newline at end of file
+        return self.change_amount < 0
+
+class ProductCard(models.Model):
+    """
+    Denormalized read model holding the pre-serialized list payload of a product.
+    Rebuilt by signal handlers whenever the product, its variants or images change.
+    """
+    product = models.OneToOneField(
+        Product,
+        verbose_name=_('Product'),
+        primary_key=True,
+        related_name='card',
+        on_delete=models.CASCADE
+    )
+    data = models.JSONField(_('Data'), encoder=DjangoJSONEncoder)
+    updated_at = models.DateTimeField(_('Updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Product Card')
+        verbose_name_plural = _('Product Cards')
+
+    def __str__(self):
+        return f"Card for product {self.product_id}"
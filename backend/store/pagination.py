@@ -0,0 +1,190 @@
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+import json
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a composite, unique ordering key.
+
+    DRF's CursorPagination filters on the first ordering field only and uses an
+    OFFSET to step over ties. Here the cursor stores a value for every ordering
+    field, with ``id`` appended as a tie-breaker, so each page is a single range
+    scan on an index such as ``(created_at, id)``. There is no COUNT query and
+    pages stay stable while rows are inserted.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering = tuple(ordering) + ('-id' if ordering[-1].startswith('-') else 'id',)
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        current_position = self.cursor.position if self.cursor else None
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+
+        if current_position is not None:
+            values = self.convert_position(queryset, self.decode_position(current_position))
+            queryset = queryset.filter(self.get_keyset_filter(queryset.model, ordering, values))
+
+        # Fetch one extra row to know whether another page follows
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = current_position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # The ordering key is unique, so the last row marks the position and
+        # cursors never need DRF's offsets; an empty page keeps its own position
+        position = (
+            self._get_position_from_instance(self.page[-1], self.ordering)
+            if self.page else self.cursor.position
+        )
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = (
+            self._get_position_from_instance(self.page[0], self.ordering)
+            if self.page else self.cursor.position
+        )
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def get_keyset_filter(self, model, ordering, values):
+        """
+        Build the condition selecting rows strictly after ``values`` in ``ordering``:
+        ``(a > x) OR (a = x AND b > y) OR ...``, honouring PostgreSQL null ordering.
+        """
+        conditions = []
+        equal = Q()
+        for order, value in zip(ordering, values):
+            descending = order.startswith('-')
+            field = order.lstrip('-')
+            nullable = self._is_nullable(model, field)
+
+            after = self._after(field, value, descending, nullable)
+            if after is not None:
+                conditions.append(equal & after)
+
+            if value is None:
+                equal &= Q(**{f'{field}__isnull': True})
+            else:
+                equal &= Q(**{field: value})
+
+        if not conditions:
+            return Q(pk__in=[])
+        condition = reduce(or_, conditions)
+
+        # Bound the leading column as well so the planner can use a range scan
+        order = ordering[0]
+        field = order.lstrip('-')
+        if values[0] is not None and not self._is_nullable(model, field):
+            bound = 'lte' if order.startswith('-') else 'gte'
+            condition &= Q(**{f'{field}__{bound}': values[0]})
+        return condition
+
+    def _after(self, field, value, descending, nullable):
+        # PostgreSQL sorts NULLs last in ascending and first in descending order
+        if value is None:
+            return Q(**{f'{field}__isnull': False}) if descending else None
+        after = Q(**{f'{field}__{"lt" if descending else "gt"}': value})
+        if nullable and not descending:
+            after |= Q(**{f'{field}__isnull': True})
+        return after
+
+    def _is_nullable(self, model, field):
+        try:
+            return model._meta.get_field(field).null
+        except FieldDoesNotExist:
+            # Annotations and aliases such as ``pk`` are never null
+            return False
+
+    def decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def convert_position(self, queryset, values):
+        """
+        Convert cursor values to the types of their ordering fields, so that a
+        tampered cursor is answered with 404 instead of failing in the query.
+        """
+        converted = []
+        for order, value in zip(self.ordering, values):
+            field = self._get_field(queryset, order.lstrip('-'))
+            if value is not None and field is not None:
+                try:
+                    value = field.to_python(value)
+                except (ValidationError, TypeError, ValueError):
+                    raise NotFound(self.invalid_cursor_message)
+                if isinstance(value, Decimal) and not value.is_finite():
+                    raise NotFound(self.invalid_cursor_message)
+            elif isinstance(value, (list, dict)):
+                raise NotFound(self.invalid_cursor_message)
+            converted.append(value)
+        return converted
+
+    def _get_field(self, queryset, name):
+        if name == 'pk':
+            return queryset.model._meta.pk
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            annotation = queryset.query.annotations.get(name)
+            return annotation.output_field if annotation is not None else None
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field = order.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[field]
+            else:
+                value = getattr(instance, field)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif value is not None and not isinstance(value, (int, float)):
+                value = str(value)
+            values.append(value)
+        return json.dumps(values)
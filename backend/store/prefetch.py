@@ -0,0 +1,158 @@
+from contextlib import contextmanager
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in query budget mode when a request issues too many queries."""
+
+
+def _prefixed(prefix, lookup):
+    return f'{prefix}__{lookup}' if prefix else lookup
+
+
+def _scoped(overrides, lookup):
+    """Overrides below ``lookup``, relative to it."""
+    start = f'{lookup}__'
+    return {key[len(start):]: value for key, value in overrides.items() if key.startswith(start)}
+
+
+def _nested_serializer(field):
+    """Return the nested serializer behind a field, or None for plain fields."""
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def _hinted(serializer, hints):
+    """
+    Relations named in a ``Meta`` hint. A hint may map each relation to the fields
+    that read it, so the relation is skipped once those fields are pruned away.
+    """
+    if isinstance(hints, dict):
+        return [
+            name for name, fields in hints.items()
+            if any(field in serializer.fields for field in fields)
+        ]
+    return list(hints)
+
+
+def build_plan(serializer, model, overrides=None, prefix=''):
+    """
+    Walk a serializer's field tree and work out the relations it reads.
+
+    Returns a tuple ``(select_related, prefetch_related)`` for ``model``. Nested
+    to-one serializers become ``select_related`` joins, nested to-many serializers
+    become ``Prefetch`` objects whose querysets carry the child plan. Relations read
+    by properties or method fields are declared on the serializer ``Meta`` through
+    ``select_related_fields`` and ``prefetch_related_fields``.
+
+    ``overrides`` maps a full lookup path (e.g. ``'variants'``) to the base queryset
+    to use for that prefetch, which allows filtering prefetched rows.
+    """
+    overrides = overrides or {}
+    meta = getattr(serializer, 'Meta', None)
+    select = [
+        _prefixed(prefix, name)
+        for name in _hinted(serializer, getattr(meta, 'select_related_fields', []))
+    ]
+    prefetch = []
+    prefetched = set()
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.ManyRelatedField):
+            # Relations collapsed to primary keys still read the related rows
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            lookup = _prefixed(prefix, field.source)
+            prefetch.append(Prefetch(
+                lookup,
+                queryset=overrides.get(lookup, model_field.related_model._default_manager.all())
+            ))
+            prefetched.add(field.source)
+            continue
+        nested = _nested_serializer(field)
+        if nested is None or not field.source or '.' in field.source or field.source == '*':
+            continue
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        related_model = model_field.related_model
+        lookup = _prefixed(prefix, field.source)
+
+        if model_field.many_to_one or model_field.one_to_one:
+            select.append(lookup)
+            child_select, child_prefetch = build_plan(nested, related_model, overrides, lookup)
+            select.extend(child_select)
+            prefetch.extend(child_prefetch)
+        else:
+            child_select, child_prefetch = build_plan(
+                nested, related_model, _scoped(overrides, lookup)
+            )
+            # Django fills the reverse foreign key of prefetched rows itself
+            if model_field.one_to_many:
+                back = model_field.field.name
+                child_select = [
+                    name for name in child_select
+                    if name != back and not name.startswith(f'{back}__')
+                ]
+            queryset = overrides.get(lookup, related_model._default_manager.all())
+            if child_select:
+                queryset = queryset.select_related(*child_select)
+            if child_prefetch:
+                queryset = queryset.prefetch_related(*child_prefetch)
+            prefetch.append(Prefetch(lookup, queryset=queryset))
+            prefetched.add(field.source)
+
+    for name in _hinted(serializer, getattr(meta, 'prefetch_related_fields', [])):
+        if name in prefetched:
+            continue
+        lookup = _prefixed(prefix, name)
+        if lookup in overrides:
+            prefetch.append(Prefetch(lookup, queryset=overrides[lookup]))
+        else:
+            prefetch.append(lookup)
+
+    return select, prefetch
+
+
+def plan_queryset(queryset, serializer_class, overrides=None, context=None):
+    """
+    Apply the select_related/prefetch_related plan ``serializer_class`` needs.
+
+    Pass the serializer ``context`` when the request shapes the field tree
+    (sparse fieldsets), so only the relations actually rendered are loaded.
+    """
+    select, prefetch = build_plan(serializer_class(context=context or {}), queryset.model, overrides)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+@contextmanager
+def query_budget(budget, label=''):
+    """Fail when the wrapped block issues more than ``budget`` queries."""
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    executed = len(context.captured_queries)
+    if executed > budget:
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        raise QueryBudgetExceeded(
+            f'{label or "Block"} issued {executed} queries, budget is {budget}:\n{queries}'
+        )
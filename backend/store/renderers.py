@@ -0,0 +1,80 @@
+from rest_framework import renderers
+import uuid
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+# orjson.Fragment (3.9.15+) embeds pre-encoded JSON without parsing it
+_ORJSON_FRAGMENTS = orjson is not None and hasattr(orjson, 'Fragment')
+
+
+class JSONFragment:
+    """
+    An already-encoded JSON document, such as a cached ProductCard, that the
+    renderer writes into the response as is instead of decoding and re-encoding it.
+    """
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw.encode('utf-8') if isinstance(raw, str) else raw
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer backed by orjson.
+
+    Values orjson can't handle (Decimal, lazy translations, querysets) and
+    datetimes go through DRF's JSONEncoder so the output matches JSONRenderer.
+    Indented output (as the browsable API requests it) and environments without
+    orjson use the stdlib path, with JSONFragment values spliced in afterwards.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+
+        if orjson is None or indent or not self.compact or self.ensure_ascii:
+            return self._render_stdlib(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=self._default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        )
+        # Same escaping as JSONRenderer for JavaScript compatibility
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+    def _default(self, obj):
+        if isinstance(obj, JSONFragment):
+            if _ORJSON_FRAGMENTS:
+                return orjson.Fragment(obj.raw)
+            return orjson.loads(obj.raw)
+        return self.encoder_class().default(obj)
+
+    def _render_stdlib(self, data, accepted_media_type, renderer_context):
+        fragments = {}
+        marker = uuid.uuid4().hex
+        base_encoder = self.encoder_class
+
+        class FragmentEncoder(base_encoder):
+            def default(self, obj):
+                if isinstance(obj, JSONFragment):
+                    token = f'{marker}:{len(fragments)}'
+                    fragments[token] = obj.raw
+                    return token
+                return super().default(obj)
+
+        self.encoder_class = FragmentEncoder
+        try:
+            ret = super().render(data, accepted_media_type, renderer_context)
+        finally:
+            del self.encoder_class
+
+        for token, raw in fragments.items():
+            ret = ret.replace(f'"{token}"'.encode('ascii'), raw, 1)
+        return ret
+
@@ -1,15 +1,19 @@
 from .category import (
     CategoryRequestSerializer,
     CategoryResponseSerializer,
+    CategoryDetailResponseSerializer,
 )
 from .product import (
     ProductRequestSerializer,
     ProductResponseSerializer,
     ProductDetailResponseSerializer,
+    ProductCardSerializer,
     ProductImageRequestSerializer,
     ProductImageResponseSerializer,
     ProductVariantRequestSerializer,
     ProductVariantResponseSerializer,
+    ProductVariantBulkRequestSerializer,
+    StockHistoryResponseSerializer,
 )
 from .cart import (
     CartItemRequestSerializer,
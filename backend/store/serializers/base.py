@@ -2,6 +2,26 @@ from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
 from typing import List, Dict, Optional, Any
 
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _parse_names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def _below(names, field_name):
+    """Names under ``field_name`` in a set of dotted names, relative to it."""
+    start = f'{field_name}.'
+    return {name[len(start):] for name in names if name.startswith(start)}
+
+
+def has_field_selection(request):
+    """Whether the request shapes the response with ``?fields=`` or ``?expand=``."""
+    query_params = getattr(request, 'query_params', {})
+    return bool(query_params.get(FIELDS_PARAM) or query_params.get(EXPAND_PARAM))
+
+
 class BaseSerializer(serializers.ModelSerializer):
     """Base serializer with common functionality"""
     class Meta:
@@ -15,4 +35,55 @@ class BaseRequestSerializer(BaseSerializer):
 class BaseResponseSerializer(BaseSerializer):
     """Base serializer for response data"""
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and expandable relations driven by the request.
+
+    ``?fields=id,name,variants.sku`` keeps only the listed fields; a dotted name
+    selects fields of a nested serializer. In a sparse fieldset, nested relations
+    are rendered as primary keys unless listed in ``?expand=`` (or selected with
+    dotted names). Without ``fields`` the full representation is returned.
+
+    Only the root serializer reads the request, and the prefetch planner walks the
+    pruned field tree, so dropped relations are never queried.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if self.parent is None and request is not None and has_field_selection(request):
+            fields = request.query_params.get(FIELDS_PARAM)
+            self._shape(
+                self,
+                _parse_names(fields) if fields else None,
+                _parse_names(request.query_params.get(EXPAND_PARAM, ''))
+            )
+
+    @classmethod
+    def _shape(cls, serializer, fields, expand):
+        if fields is not None:
+            keep = {name.split('.', 1)[0] for name in fields}
+            for name in list(serializer.fields):
+                if name not in keep:
+                    serializer.fields.pop(name)
+
+        for name, field in list(serializer.fields.items()):
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+
+            nested_fields = _below(fields, name) if fields is not None else set()
+            nested_expand = _below(expand, name)
+            if fields is not None and not (name in expand or nested_fields or nested_expand):
+                serializer.fields[name] = cls._collapse(name, field, many)
+            else:
+                cls._shape(nested, nested_fields or None, nested_expand)
+
+    @staticmethod
+    def _collapse(name, field, many):
+        kwargs = {'read_only': True, 'many': many}
+        if field.source != name:
+            kwargs['source'] = field.source
+        return serializers.PrimaryKeyRelatedField(**kwargs)
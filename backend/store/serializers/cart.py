@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
-from .base import BaseRequestSerializer, BaseResponseSerializer
+from .base import BaseRequestSerializer, BaseResponseSerializer, DynamicFieldsMixin
 from .product import ProductVariantResponseSerializer
 from ..models import Cart, CartItem, ProductVariant
 from decimal import Decimal
@@ -56,6 +56,8 @@ class CartItemResponseSerializer(BaseResponseSerializer):
         model = CartItem
         fields = ['id', 'variant', 'quantity', 'total_price']
         read_only_fields = ['id', 'total_price']
+        # total_price reads variant.final_price
+        select_related_fields = {'variant__product': ['total_price']}
 
     @extend_schema_field(serializers.DecimalField(max_digits=10, decimal_places=2))
     def get_total_price(self, obj) -> Optional[Decimal]:
@@ -63,7 +65,7 @@ class CartItemResponseSerializer(BaseResponseSerializer):
             return obj.total_price
         return None
 
-class CartResponseSerializer(BaseResponseSerializer):
+class CartResponseSerializer(DynamicFieldsMixin, BaseResponseSerializer):
     items = CartItemResponseSerializer(many=True, read_only=True)
     total_amount = serializers.SerializerMethodField()
     total_items = serializers.SerializerMethodField()
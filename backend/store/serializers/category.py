@@ -2,6 +2,7 @@ from rest_framework import serializers
 from drf_spectacular.utils import extend_schema_field
 from typing import List, Dict, Any
 from .base import BaseRequestSerializer, BaseResponseSerializer
+from ..category_tree import get_category_tree
 from ..models import Category
 
 class CategoryRequestSerializer(BaseRequestSerializer):
@@ -24,7 +25,15 @@ class CategoryResponseSerializer(BaseResponseSerializer):
     @extend_schema_field(List[Dict])
     def get_children(self, obj) -> List[Dict[str, Any]]:
         """Get active child categories"""
-        return CategoryResponseSerializer(
-            obj.children.filter(is_active=True), 
-            many=True
-        ).data
\ No newline at end of file
+        # Served from the in-process category tree instead of a query per node,
+        # resolved once per response through the shared serializer context
+        tree = self.context.get('category_tree')
+        if tree is None:
+            tree = self.context['category_tree'] = get_category_tree()
+        return tree.get_children(obj.pk)
+
+class CategoryDetailResponseSerializer(CategoryResponseSerializer):
+    """Category with its maintained product and in-stock variant counters."""
+    class Meta(CategoryResponseSerializer.Meta):
+        fields = CategoryResponseSerializer.Meta.fields + list(Category.COUNTER_FIELDS)
+        read_only_fields = fields
@@ -0,0 +1,185 @@
+"""
+Compiled fast-path serializers for hot read endpoints.
+
+These build the same JSON shape as the DRF response serializers from ``.values()``
+rows and plain dicts. Field formatting reuses one DRF field instance per column,
+so output matches the ModelSerializers exactly without instantiating serializers
+and fields for every nested row. Nested rows follow each model's Meta.ordering,
+like the prefetches behind the serializers.
+"""
+from collections import defaultdict
+from rest_framework import serializers
+
+from ..category_tree import compile_categories, get_category_tree
+from ..models import Product, ProductVariant, ProductImage, Order, OrderItem
+from .product import get_derivative_urls
+
+_decimal = serializers.DecimalField(max_digits=10, decimal_places=2)
+_decimal_number = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False)
+_datetime = serializers.DateTimeField()
+_image_storage = ProductImage._meta.get_field('image').storage
+
+
+def _image_url(name, request=None):
+    if not name:
+        return None
+    url = _image_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def _compile_image(row, request=None):
+    return {
+        'id': row['id'],
+        'image': _image_url(row['image'], request),
+        'alt_text': row['alt_text'],
+        'type': row['type'],
+        'order': row['order'],
+        'variant': row['variant_id'],
+        'derivatives': get_derivative_urls(row['derivatives'], _image_storage, request),
+    }
+
+
+def _image_rows(**filters):
+    return ProductImage.objects.filter(**filters).order_by(*ProductImage._meta.ordering).values(
+        'id', 'image', 'alt_text', 'type', 'order', 'variant_id', 'product_id', 'is_active',
+        'derivatives'
+    )
+
+
+def _variant_rows(**filters):
+    return list(ProductVariant.objects.filter(**filters).order_by(*ProductVariant._meta.ordering).values(
+        'id', 'product_id', 'sku', 'attributes', 'price_adjustment',
+        'stock_quantity', 'is_active', 'product__base_price'
+    ))
+
+
+def compile_variants(rows, request=None):
+    """Payloads shaped like ProductVariantResponseSerializer, by variant id."""
+    images = defaultdict(list)
+    for image in _image_rows(variant_id__in=[row['id'] for row in rows]):
+        images[image['variant_id']].append(_compile_image(image, request))
+
+    return {
+        row['id']: {
+            'id': row['id'],
+            'sku': row['sku'],
+            'attributes': row['attributes'],
+            'price_adjustment': _decimal.to_representation(row['price_adjustment']),
+            'stock_quantity': row['stock_quantity'],
+            'is_active': row['is_active'],
+            'final_price': _decimal.to_representation(
+                row['product__base_price'] + row['price_adjustment']
+            ),
+            'images': images[row['id']],
+        }
+        for row in rows
+    }
+
+
+def compile_products(product_ids, request=None, card=False):
+    """
+    Payloads shaped like ProductResponseSerializer (or ProductCardSerializer when
+    ``card`` is set), by product id.
+    """
+    rows = list(Product.objects.filter(pk__in=product_ids).values(
+        'id', 'category_id', 'name', 'slug', 'description', 'base_price',
+        'is_active', 'meta_title', 'meta_description'
+    ))
+    product_ids = [row['id'] for row in rows]
+    # Category payloads come from the in-process tree snapshot; only a category
+    # it doesn't know yet (created in this same transaction) costs a full compile
+    tree = get_category_tree()
+    categories = tree.payloads
+    if any(row['category_id'] not in categories for row in rows):
+        categories = compile_categories()
+
+    variants = defaultdict(list)
+    prices = defaultdict(list)
+    in_stock = defaultdict(bool)
+    variant_rows = _variant_rows(product_id__in=product_ids)
+    variant_payloads = compile_variants(variant_rows, request)
+    for variant in variant_rows:
+        variants[variant['product_id']].append(variant_payloads[variant['id']])
+        if variant['is_active']:
+            prices[variant['product_id']].append(
+                variant['product__base_price'] + variant['price_adjustment']
+            )
+            if variant['stock_quantity'] > 0:
+                in_stock[variant['product_id']] = True
+
+    images = defaultdict(list)
+    main_images = {}
+    for image in _image_rows(product_id__in=product_ids):
+        payload = _compile_image(image, request)
+        images[image['product_id']].append(payload)
+        if image['type'] == 'main' and image['is_active']:
+            main_images.setdefault(image['product_id'], payload)
+
+    payloads = {}
+    for row in rows:
+        product_id = row['id']
+        payload = {
+            'id': product_id,
+            'category': categories.get(row['category_id']),
+            'name': row['name'],
+            'slug': row['slug'],
+            'description': row['description'],
+            'base_price': _decimal.to_representation(row['base_price']),
+            'is_active': row['is_active'],
+            'variants': variants[product_id],
+            'images': images[product_id],
+            'main_image': main_images.get(product_id),
+            'meta_title': row['meta_title'],
+            'meta_description': row['meta_description'],
+        }
+        if card:
+            product_prices = prices[product_id]
+            payload['min_price'] = str(min(product_prices)) if product_prices else None
+            payload['max_price'] = str(max(product_prices)) if product_prices else None
+            payload['in_stock'] = in_stock[product_id]
+        payloads[product_id] = payload
+    return payloads
+
+
+def compile_orders(order_ids, request=None):
+    """Payloads shaped like OrderResponseSerializer, by order id."""
+    rows = list(Order.objects.filter(pk__in=order_ids).values(
+        'id', 'status', 'total_amount', 'shipping_address', 'shipping_method',
+        'tracking_number', 'notes', 'created_at', 'updated_at'
+    ))
+    item_rows = list(OrderItem.objects.filter(order_id__in=order_ids).order_by(*OrderItem._meta.ordering).values(
+        'id', 'order_id', 'variant_id', 'quantity', 'price'
+    ))
+    variants = compile_variants(
+        _variant_rows(pk__in={item['variant_id'] for item in item_rows}), request
+    )
+
+    items = defaultdict(list)
+    for item in item_rows:
+        items[item['order_id']].append({
+            'id': item['id'],
+            'variant': variants.get(item['variant_id']),
+            'quantity': item['quantity'],
+            'price': _decimal.to_representation(item['price']),
+            'total_price': _decimal.to_representation(item['price'] * item['quantity']),
+        })
+
+    statuses = dict(Order.STATUS_CHOICES)
+    return {
+        row['id']: {
+            'id': row['id'],
+            'status': row['status'],
+            'status_display': str(statuses.get(row['status'], row['status'])),
+            'total_amount': _decimal_number.to_representation(row['total_amount']),
+            'shipping_address': row['shipping_address'],
+            'shipping_method': row['shipping_method'],
+            'tracking_number': row['tracking_number'],
+            'notes': row['notes'],
+            'items': items[row['id']],
+            'created_at': _datetime.to_representation(row['created_at']),
+            'updated_at': _datetime.to_representation(row['updated_at']),
+        }
+        for row in rows
+    }
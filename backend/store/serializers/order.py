@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .base import BaseRequestSerializer, BaseResponseSerializer
+from .base import BaseRequestSerializer, BaseResponseSerializer, DynamicFieldsMixin
 from .product import ProductVariantResponseSerializer
 from ..models import Order, OrderItem, Cart
 from decimal import Decimal, InvalidOperation
@@ -94,10 +94,11 @@ class CreateOrderRequestSerializer(BaseRequestSerializer):
         # Bulk create order items
         OrderItem.objects.bulk_create(order_items)
 
-        # Clear cart items and deactivate cart
-        cart.items.all().delete()
+        # Clear cart items and deactivate cart; clear() zeroes the stored totals,
+        # which the bulk delete of the items doesn't adjust
+        cart.clear()
         cart.is_active = False
-        cart.save()
+        cart.save(update_fields=['is_active', 'updated_at'])
 
         return order
 
@@ -135,7 +136,7 @@ class UpdateOrderRequestSerializer(BaseRequestSerializer):
             raise serializers.ValidationError("Cannot change status of refunded order")
         return value
 
-class OrderResponseSerializer(BaseResponseSerializer):
+class OrderResponseSerializer(DynamicFieldsMixin, BaseResponseSerializer):
     items = OrderItemResponseSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     total_amount = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False)
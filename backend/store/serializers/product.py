@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from .base import BaseRequestSerializer, BaseResponseSerializer
+from .base import BaseRequestSerializer, BaseResponseSerializer, DynamicFieldsMixin
 from .category import CategoryResponseSerializer
-from ..models import Product, ProductVariant, ProductImage
+from ..models import Product, ProductVariant, ProductImage, StockHistory
 from typing import Dict, Optional, Any
 from drf_spectacular.utils import extend_schema_field
 
+# Most variants accepted by a single bulk upsert request
+BULK_VARIANT_LIMIT = 5000
+
 class ProductImageRequestSerializer(BaseRequestSerializer):
     image = serializers.ImageField(required=True)
 
@@ -15,24 +18,62 @@ class ProductImageRequestSerializer(BaseRequestSerializer):
             'alt_text': {'min_length': 1}
         }
 
+def get_derivative_urls(derivatives, storage, request=None):
+    """Public form of ``ProductImage.derivatives``: sizes with a URL per format."""
+    urls = {}
+    for size, entry in derivatives.get('sizes', {}).items():
+        urls[size] = {}
+        for key, value in entry.items():
+            if key not in ('width', 'height'):
+                value = storage.url(value)
+                if request is not None:
+                    value = request.build_absolute_uri(value)
+            urls[size][key] = value
+    return urls
+
 class ProductImageResponseSerializer(BaseResponseSerializer):
+    derivatives = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'alt_text', 'type', 'order', 'variant']
+        fields = ['id', 'image', 'alt_text', 'type', 'order', 'variant', 'derivatives']
         read_only_fields = ['id']
 
+    @extend_schema_field(serializers.DictField(child=serializers.DictField()))
+    def get_derivatives(self, obj) -> Dict[str, Dict[str, Any]]:
+        return get_derivative_urls(obj.derivatives, obj.image.storage, self.context.get('request'))
+
 class ProductVariantRequestSerializer(BaseRequestSerializer):
     class Meta:
         model = ProductVariant
         fields = ['sku', 'attributes', 'price_adjustment', 'stock_quantity', 'is_active']
+        # Uniqueness of sku is checked by the model field's UniqueValidator
         extra_kwargs = {
             'sku': {'min_length': 1},
             'attributes': {'required': True}
         }
 
-    def validate_sku(self, value):
-        if self.instance is None and ProductVariant.objects.filter(sku=value).exists():
-            raise serializers.ValidationError("SKU must be unique")
+class ProductVariantBulkItemSerializer(serializers.Serializer):
+    """
+    One variant of a bulk upsert, keyed by SKU. Fields left out keep their
+    current value on existing variants.
+    """
+    sku = serializers.CharField(min_length=1, max_length=100)
+    product = serializers.IntegerField(source='product_id', required=False)
+    attributes = serializers.DictField(required=False)
+    price_adjustment = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    stock_quantity = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
+
+class ProductVariantBulkRequestSerializer(serializers.Serializer):
+    variants = ProductVariantBulkItemSerializer(many=True, allow_empty=False, max_length=BULK_VARIANT_LIMIT)
+
+    def validate_variants(self, value):
+        seen = set()
+        for item in value:
+            if item['sku'] in seen:
+                raise serializers.ValidationError(f"Duplicate SKU: {item['sku']}")
+            seen.add(item['sku'])
         return value
 
 class ProductVariantResponseSerializer(BaseResponseSerializer):
@@ -46,6 +87,17 @@ class ProductVariantResponseSerializer(BaseResponseSerializer):
             'stock_quantity', 'is_active', 'final_price', 'images'
         ]
         read_only_fields = ['id', 'final_price']
+        # final_price reads product.base_price
+        select_related_fields = {'product': ['final_price']}
+
+class StockHistoryResponseSerializer(BaseResponseSerializer):
+    class Meta:
+        model = StockHistory
+        fields = [
+            'id', 'variant', 'user', 'old_quantity', 'new_quantity',
+            'change_amount', 'note', 'created_at'
+        ]
+        read_only_fields = fields
 
 class ProductRequestSerializer(BaseRequestSerializer):
     category_id = serializers.IntegerField(write_only=True)
@@ -63,7 +115,7 @@ class ProductRequestSerializer(BaseRequestSerializer):
             'base_price': {'required': True}
         }
 
-class ProductResponseSerializer(BaseResponseSerializer):
+class ProductResponseSerializer(DynamicFieldsMixin, BaseResponseSerializer):
     category = CategoryResponseSerializer(read_only=True)
     variants = ProductVariantResponseSerializer(many=True, read_only=True)
     images = ProductImageResponseSerializer(many=True, read_only=True)
@@ -80,11 +132,44 @@ class ProductResponseSerializer(BaseResponseSerializer):
 
     @extend_schema_field(ProductImageResponseSerializer)
     def get_main_image(self, obj) -> Optional[Dict[str, Any]]:
-        main_image = obj.images.filter(type='main', is_active=True).first()
+        # Iterate images.all() so a prefetched relation is reused instead of querying per row
+        main_image = next(
+            (image for image in obj.images.all() if image.type == 'main' and image.is_active),
+            None
+        )
         if main_image:
-            return ProductImageResponseSerializer(main_image).data
+            return ProductImageResponseSerializer(main_image, context=self.context).data
         return None
 
+class ProductCardSerializer(ProductResponseSerializer):
+    """Serializer used to build the denormalized ProductCard document."""
+    min_price = serializers.SerializerMethodField()
+    max_price = serializers.SerializerMethodField()
+    in_stock = serializers.SerializerMethodField()
+
+    class Meta(ProductResponseSerializer.Meta):
+        fields = ProductResponseSerializer.Meta.fields + ['min_price', 'max_price', 'in_stock']
+
+    def _active_prices(self, obj):
+        return [variant.final_price for variant in obj.variants.all() if variant.is_active]
+
+    @extend_schema_field(serializers.DecimalField(max_digits=10, decimal_places=2))
+    def get_min_price(self, obj) -> Optional[str]:
+        prices = self._active_prices(obj)
+        return str(min(prices)) if prices else None
+
+    @extend_schema_field(serializers.DecimalField(max_digits=10, decimal_places=2))
+    def get_max_price(self, obj) -> Optional[str]:
+        prices = self._active_prices(obj)
+        return str(max(prices)) if prices else None
+
+    @extend_schema_field(serializers.BooleanField())
+    def get_in_stock(self, obj) -> bool:
+        return any(
+            variant.is_active and variant.stock_quantity > 0
+            for variant in obj.variants.all()
+        )
+
 class ProductDetailResponseSerializer(ProductResponseSerializer):
     class Meta(ProductResponseSerializer.Meta):
         fields = ProductResponseSerializer.Meta.fields + ['created_at', 'updated_at']
@@ -0,0 +1,187 @@
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete, pre_migrate
+from django.dispatch import receiver
+import threading
+import logging
+
+from .models import Category, Product, ProductVariant, ProductImage
+from .caching import PRODUCT_TAG, bump_catalog_version, purge_tags
+from .category_tree import bump_category_tree_version
+from .counters import count_product_change, count_variant_change, recount_product_categories
+from .catalog import refresh_products
+from .images import needs_derivatives, schedule_derivatives, release_image_file
+
+logger = logging.getLogger(__name__)
+
+_pending = threading.local()
+
+
+def _pending_product_ids():
+    if not hasattr(_pending, 'product_ids'):
+        _pending.product_ids = set()
+    return _pending.product_ids
+
+
+def _flush_product_changes():
+    """Rebuild denormalized product data for everything touched in the transaction."""
+    product_ids = _pending_product_ids()
+    if not product_ids:
+        return
+    ids = list(product_ids)
+    product_ids.clear()
+    refresh_products(ids)
+    bump_catalog_version()
+    purge_tags(PRODUCT_TAG)
+
+
+def schedule_product_refresh(*product_ids):
+    """Queue products for a refresh once the current transaction commits."""
+    _pending_product_ids().update(pk for pk in product_ids if pk)
+    transaction.on_commit(_flush_product_changes)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, **kwargs):
+    schedule_product_refresh(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+def variant_changed(sender, instance, **kwargs):
+    schedule_product_refresh(instance.product_id)
+
+
+def _counted_product(product):
+    return (product.category_id, product.is_active)
+
+
+def _counted_variant(variant):
+    return (variant.product_id, variant.is_active and variant.stock_quantity > 0)
+
+
+@receiver(pre_save, sender=Product)
+def product_saving(sender, instance, **kwargs):
+    # Category counters are adjusted by the difference to the stored row
+    instance._counted_state = None
+    if instance.pk and not kwargs.get('raw'):
+        instance._counted_state = Product.objects.filter(pk=instance.pk).values_list(
+            'category_id', 'is_active'
+        ).first()
+
+
+@receiver(post_save, sender=Product)
+def product_counted(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        count_product_change(instance.pk, instance._counted_state, _counted_product(instance))
+
+
+@receiver(post_delete, sender=Product)
+def product_uncounted(sender, instance, **kwargs):
+    count_product_change(instance.pk, _counted_product(instance), None)
+
+
+@receiver(pre_save, sender=ProductVariant)
+def variant_saving(sender, instance, **kwargs):
+    instance._counted_state = None
+    if instance.pk and not kwargs.get('raw'):
+        state = ProductVariant.objects.filter(pk=instance.pk).values_list(
+            'product_id', 'is_active', 'stock_quantity'
+        ).first()
+        if state is not None:
+            instance._counted_state = (state[0], state[1] and state[2] > 0)
+
+
+@receiver(post_save, sender=ProductVariant)
+def variant_counted(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        count_variant_change(instance._counted_state, _counted_variant(instance))
+
+
+@receiver(post_delete, sender=ProductVariant)
+def variant_uncounted(sender, instance, **kwargs):
+    count_variant_change(_counted_variant(instance), None)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def image_changed(sender, instance, **kwargs):
+    schedule_product_refresh(instance.product_id)
+
+
+@receiver(pre_save, sender=ProductImage)
+def image_saving(sender, instance, **kwargs):
+    # Remember the file being replaced; it may be shared, so it's released after commit
+    instance._previous_image = None
+    if instance.pk and not kwargs.get('raw'):
+        instance._previous_image = ProductImage.objects.filter(
+            pk=instance.pk
+        ).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=ProductImage)
+def image_saved(sender, instance, **kwargs):
+    if needs_derivatives(instance):
+        transaction.on_commit(lambda: schedule_derivatives(instance.pk))
+    previous = getattr(instance, '_previous_image', None)
+    if previous and previous != instance.image.name:
+        transaction.on_commit(lambda: release_image_file(previous))
+
+
+@receiver(post_delete, sender=ProductImage)
+def image_deleted(sender, instance, **kwargs):
+    name = instance.image.name
+    transaction.on_commit(lambda: release_image_file(name))
+
+
+@receiver(post_save, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # Responses embed the category together with its children, so ancestors are
+    # affected too; after a move both the new and the old ones
+    category_ids = {
+        instance.pk,
+        *[ancestor.pk for ancestor in instance.get_ancestors()],
+        *getattr(instance, '_previous_ancestor_ids', ()),
+    }
+    Category.objects.filter(pk__in=category_ids).update(version=F('version') + 1)
+    # Ahead of the product refresh, so payloads cached for the new product versions see the new tree
+    transaction.on_commit(bump_category_tree_version)
+    product_ids = Product.objects.filter(category__in=category_ids).values_list('pk', flat=True)
+    schedule_product_refresh(*product_ids)
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    # Ancestors embed the deleted category among their children
+    ancestor_ids = instance.ancestor_ids
+    Category.objects.filter(pk__in=ancestor_ids).update(version=F('version') + 1)
+    transaction.on_commit(bump_category_tree_version)
+    product_ids = Product.objects.filter(category__in=ancestor_ids).values_list('pk', flat=True)
+    schedule_product_refresh(*product_ids)
+    transaction.on_commit(bump_catalog_version)
+
+
+def notify_bulk_update(model, pks):
+    """
+    Run the change handlers for rows modified through QuerySet.update(),
+    which bypasses model signals.
+    """
+    if model is Product:
+        schedule_product_refresh(*pks)
+        recount_product_categories(pks)
+    elif model in (ProductVariant, ProductImage):
+        product_ids = set(model.objects.filter(pk__in=pks).values_list('product_id', flat=True))
+        schedule_product_refresh(*product_ids)
+        if model is ProductVariant:
+            recount_product_categories(product_ids)
+    elif model is Category:
+        for category in Category.objects.filter(pk__in=pks):
+            category_changed(Category, category)
+
+
+@receiver(pre_migrate)
+def create_postgres_extensions(sender, using, **kwargs):
+    """Make sure the extensions our indexes rely on exist before tables are created."""
+    if sender.name != 'store':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
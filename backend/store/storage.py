@@ -0,0 +1,71 @@
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+import hashlib
+import os
+import posixpath
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_digest(content):
+    """BLAKE2b digest of a file's content, read in chunks."""
+    digest = hashlib.blake2b(digest_size=20)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file under a name derived from its content, so identical uploads
+    share one file and a name always refers to the same bytes.
+
+    ``products/photo.jpg`` is saved as ``products/ab/cd/abcd...ef.jpg``. Saving
+    content that already exists returns the existing name without writing, but
+    refreshes its modification time so it counts as recently used. Files
+    are never overwritten with different content, which makes their URLs safe to
+    cache forever. Deleting a shared file is up to the caller, which must check
+    that nothing references it any more.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Concurrent saves of the same content write identical bytes
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(*args, **kwargs)
+
+    def get_content_name(self, name, content):
+        dirname, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        digest = content_digest(content)
+        return posixpath.join(dirname, digest[:2], digest[2:4], f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            self.touch(name)
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def touch(self, name):
+        """Mark a stored file as just used, see ``store.images.release_image_file``."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def save_derived(self, name, content):
+        """
+        Store a file derived from a content-addressed one (a resized copy, say)
+        under the given name as is. The source never changes, so neither does
+        anything derived from it.
+        """
+        return super().save(name, content)
@@ -0,0 +1,45 @@
+from decimal import Decimal
+from rest_framework.test import APIClient
+import pytest
+
+from store.models import Category, Product, ProductVariant
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    cache.clear()
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def catalog(db):
+    """Three levels of categories, each holding products with a few variants."""
+    parent = None
+    products = []
+    for depth in range(3):
+        category = Category.objects.create(name=f'Level {depth}', slug=f'level-{depth}', parent=parent)
+        Category.objects.create(name=f'Sibling {depth}', slug=f'sibling-{depth}', parent=parent)
+        for index in range(3):
+            product = Product.objects.create(
+                category=category,
+                name=f'Product {depth}.{index}',
+                slug=f'product-{depth}-{index}',
+                description='Test product',
+                base_price=Decimal('20.00')
+            )
+            for size in ('S', 'M', 'L'):
+                ProductVariant.objects.create(
+                    product=product,
+                    sku=f'SKU-{depth}-{index}-{size}',
+                    attributes={'size': size},
+                    price_adjustment=Decimal('1.50'),
+                    stock_quantity=5
+                )
+            products.append(product)
+        parent = category
+    return products
@@ -0,0 +1,86 @@
+from decimal import Decimal
+from rest_framework.test import APIRequestFactory
+import pytest
+
+from store.models import Cart, ProductVariant
+from store.serializers import CreateOrderRequestSerializer
+from users.models import User
+
+
+@pytest.fixture
+def cart(db):
+    user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+    return Cart.objects.create(user=user)
+
+
+def stored_totals(cart):
+    return Cart.objects.values_list(*Cart.TOTAL_FIELDS).get(pk=cart.pk)
+
+
+def expected_totals(cart):
+    """Totals recomputed from the items, as reconcile_totals() would store them."""
+    items = list(cart.items.all())
+    return (
+        sum((item.unit_price * item.quantity for item in items), Decimal('0.00')),
+        len(items),
+        sum(item.quantity for item in items),
+    )
+
+
+def test_item_changes_keep_totals_in_step(cart, catalog):
+    small, medium = catalog[0].variants.all()[:2]
+
+    cart.add_item(small, 2)
+    cart.add_item(medium, 1)
+    cart.add_item(small, 1)
+    assert stored_totals(cart) == (Decimal('86.00'), 2, 4)
+
+    cart.update_item(medium, 3)
+    cart.update_item(small, 0)
+    assert stored_totals(cart) == (Decimal('64.50'), 1, 3)
+    assert stored_totals(cart) == expected_totals(cart)
+    assert Cart.reconcile_totals([cart.pk]) == 0
+
+
+def test_removing_an_item_subtracts_the_price_it_was_added_at(cart, catalog):
+    variant = catalog[0].variants.first()
+    cart.add_item(variant, 2)
+    ProductVariant.objects.filter(pk=variant.pk).update(price_adjustment=Decimal('5.00'))
+
+    cart.update_item(ProductVariant.objects.get(pk=variant.pk), 0)
+    assert stored_totals(cart) == (Decimal('0.00'), 0, 0)
+
+
+def test_reconcile_reprices_items(cart, catalog):
+    variant = catalog[0].variants.first()
+    cart.add_item(variant, 2)
+    ProductVariant.objects.filter(pk=variant.pk).update(price_adjustment=Decimal('5.00'))
+
+    assert Cart.reconcile_totals() == 1
+    assert stored_totals(cart) == (Decimal('50.00'), 1, 2)
+
+
+def test_full_save_keeps_concurrent_totals(cart, catalog):
+    stale = Cart.objects.get(pk=cart.pk)
+    cart.add_item(catalog[0].variants.first(), 1)
+
+    stale.save()
+    assert stored_totals(cart) == (Decimal('21.50'), 1, 1)
+
+
+def test_checkout_zeroes_the_cart_totals(cart, catalog):
+    cart.add_item(catalog[0].variants.first(), 2)
+    request = APIRequestFactory().post('/')
+    request.user = cart.user
+    serializer = CreateOrderRequestSerializer(
+        data={'shipping_address': '1 Test Street', 'shipping_method': 'courier'},
+        context={'request': request}
+    )
+    assert serializer.is_valid(), serializer.errors
+
+    order = serializer.save()
+
+    assert order.total_amount == Decimal('43.00')
+    cart.refresh_from_db()
+    assert not cart.is_active
+    assert stored_totals(cart) == (Decimal('0.00'), 0, 0)
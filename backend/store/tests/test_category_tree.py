@@ -0,0 +1,14 @@
+from unittest import mock
+
+from store import category_tree
+from store.models import Category
+from store.serializers import CategoryDetailResponseSerializer
+
+
+def test_serializer_resolves_the_tree_once_per_response(catalog):
+    with mock.patch(
+        'store.serializers.category.get_category_tree', wraps=category_tree.get_category_tree
+    ) as get_tree:
+        data = CategoryDetailResponseSerializer(Category.objects.all(), many=True).data
+    assert len(data) == 6
+    assert get_tree.call_count == 1
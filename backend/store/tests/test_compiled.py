@@ -0,0 +1,58 @@
+from decimal import Decimal
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+import json
+import pytest
+
+from store.catalog import get_card_queryset
+from store.models import Order, OrderItem
+from store.serializers import ProductCardSerializer, OrderResponseSerializer
+from store.serializers.compiled import compile_products, compile_orders
+from store.views import OrderViewSet
+from users.models import User
+
+
+def render(data):
+    # Compare the rendered JSON, as clients see it
+    return json.loads(JSONRenderer().render(data))
+
+
+@pytest.fixture
+def orders(catalog):
+    user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret', is_staff=True)
+    orders = []
+    for products in (catalog[:2], catalog[2:5]):
+        order = Order.objects.create(
+            user=user,
+            total_amount=Decimal('100.00'),
+            shipping_address='1 Test Street',
+            shipping_method='courier'
+        )
+        for product in products:
+            for variant in product.variants.all():
+                OrderItem.objects.create(order=order, variant=variant, quantity=2, price=variant.final_price)
+        orders.append(order)
+    return orders
+
+
+def viewset_queryset(viewset_class, user):
+    request = APIRequestFactory().get('/')
+    force_authenticate(request, user=user)
+    view = viewset_class(action_map={'get': 'list'}, format_kwarg=None, args=(), kwargs={})
+    view.request = view.initialize_request(request)
+    return view.get_queryset()
+
+
+def test_compiled_product_cards_match_serializer(catalog):
+    product_ids = [product.pk for product in catalog]
+    cards = ProductCardSerializer(get_card_queryset().filter(pk__in=product_ids), many=True).data
+    compiled = compile_products(product_ids, card=True)
+    assert render(cards) == render([compiled[card['id']] for card in cards])
+
+
+def test_compiled_orders_match_serializer(orders):
+    queryset = viewset_queryset(OrderViewSet, orders[0].user)
+    serialized = OrderResponseSerializer(queryset, many=True).data
+    compiled = compile_orders([order.pk for order in orders])
+    assert len(serialized) == len(orders)
+    assert render(serialized) == render([compiled[order['id']] for order in serialized])
@@ -0,0 +1,81 @@
+from django.core.management import call_command
+import io
+import pytest
+
+from store.models import Category, Product, ProductVariant
+
+
+def counters():
+    return {
+        row.pop('slug'): row
+        for row in Category.objects.values('slug', *Category.COUNTER_FIELDS)
+    }
+
+
+def assert_matches_recount():
+    """The counters maintained by deltas equal a recount from scratch."""
+    maintained = counters()
+    call_command('recount_categories', stdout=io.StringIO())
+    assert maintained == counters()
+
+
+@pytest.fixture
+def tree(catalog):
+    assert_matches_recount()
+    return {category.slug: category for category in Category.objects.all()}
+
+
+def test_created_catalog_is_counted(tree):
+    assert counters()['level-0'] == {
+        'product_count': 3,
+        'variant_count': 9,
+        'subtree_product_count': 9,
+        'subtree_variant_count': 27,
+    }
+
+
+def test_deactivating_products_and_variants(tree):
+    product = Product.objects.get(slug='product-2-0')
+    product.is_active = False
+    product.save()
+    variant = ProductVariant.objects.get(sku='SKU-1-0-S')
+    variant.stock_quantity = 0
+    variant.save()
+    assert_matches_recount()
+    assert counters()['level-0']['subtree_variant_count'] == 23
+
+
+def test_moving_a_product(tree):
+    product = Product.objects.get(slug='product-2-0')
+    product.category = tree['sibling-0']
+    product.save()
+    assert_matches_recount()
+
+
+def test_moving_a_subtree(tree):
+    category = Category.objects.get(slug='level-1')
+    category.parent = tree['sibling-0']
+    category.save()
+    assert_matches_recount()
+    assert counters()['level-0']['subtree_product_count'] == 3
+    assert counters()['sibling-0']['subtree_product_count'] == 6
+
+
+def test_moving_a_subtree_to_the_root(tree):
+    category = Category.objects.get(slug='level-2')
+    category.parent = None
+    category.save()
+    assert_matches_recount()
+
+
+def test_deleting(tree):
+    ProductVariant.objects.get(sku='SKU-0-0-S').delete()
+    Product.objects.get(slug='product-0-1').delete()
+    Category.objects.get(slug='level-1').delete()
+    assert_matches_recount()
+    assert counters()['level-0'] == {
+        'product_count': 2,
+        'variant_count': 5,
+        'subtree_product_count': 2,
+        'subtree_variant_count': 5,
+    }
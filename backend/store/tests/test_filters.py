@@ -0,0 +1,51 @@
+from decimal import Decimal
+import pytest
+
+from store.models import Category, Product, ProductVariant
+
+
+@pytest.fixture
+def shirts(db):
+    """Products whose variants combine sizes and colors differently."""
+    category = Category.objects.create(name='Shirts', slug='shirts')
+    variants = {
+        'split': [{'size': 'S', 'color': 'Red'}, {'size': 'M', 'color': 'Blue'}],
+        'small-blue': [{'size': 'S', 'color': 'Blue'}],
+        'large-red': [{'size': 'L', 'color': 'Red'}],
+    }
+    for slug, attributes in variants.items():
+        product = Product.objects.create(
+            category=category, name=slug, slug=slug, description='Shirt', base_price=Decimal('10.00')
+        )
+        for index, attrs in enumerate(attributes):
+            ProductVariant.objects.create(
+                product=product, sku=f'{slug}-{index}', attributes=attrs, stock_quantity=1
+            )
+
+
+def get_products(client, query):
+    response = client.get(f'/api/store/products/?facets=true&{query}')
+    assert response.status_code == 200
+    data = response.json()
+    return sorted(product['slug'] for product in data['results']), data['facets']
+
+
+def test_facets_keep_the_alternatives_of_a_selected_attribute(client, shirts):
+    _, facets = get_products(client, 'attr.size=S')
+    assert facets['size'] == {'L': 1, 'M': 1, 'S': 2}
+
+
+def test_facets_count_only_variants_matching_the_other_selections(client, shirts):
+    slugs, facets = get_products(client, 'attr.size=S')
+    assert slugs == ['small-blue', 'split']
+    # The split product is small only in red
+    assert facets['color'] == {'Blue': 1, 'Red': 1}
+
+
+def test_facet_counts_match_the_filtered_results(client, shirts):
+    _, facets = get_products(client, 'attr.size=S')
+    for name, counts in facets.items():
+        for value, count in counts.items():
+            query = f'attr.size=S&attr.{name}={value}' if name != 'size' else f'attr.size={value}'
+            slugs, _ = get_products(client, query)
+            assert len(slugs) == count, (name, value)
@@ -0,0 +1,42 @@
+from decimal import Decimal
+import io
+import pytest
+
+from store.importers import CatalogImporter
+from store.models import Category, Product, ProductVariant, StockHistory
+
+CSV = """sku,name,slug,description,base_price,category,stock_quantity,attributes
+SHIRT-S,Shirt,shirt,Cotton shirt,10.00,shirts,3,"{""size"": ""S""}"
+SHIRT-M,Shirt,shirt,Cotton shirt,10.00,shirts,0,"{""size"": ""M""}"
+"""
+
+
+@pytest.fixture
+def shirts(db):
+    return Category.objects.create(name='Shirts', slug='shirts')
+
+
+def run_import(csv):
+    return CatalogImporter().run(io.BytesIO(csv.encode()))
+
+
+def test_import_creates_variants_and_stock_history(shirts):
+    result = run_import(CSV)
+
+    assert (result.imported, result.errors) == (2, [])
+    product = Product.objects.get(slug='shirt')
+    assert product.base_price == Decimal('10.00')
+    assert dict(product.variants.values_list('sku', 'stock_quantity')) == {'SHIRT-S': 3, 'SHIRT-M': 0}
+    assert list(StockHistory.objects.values_list('variant__sku', 'change_amount')) == [('SHIRT-S', 3)]
+
+
+def test_import_rejects_variants_of_inactive_products(shirts):
+    run_import(CSV)
+    Product.objects.filter(slug='shirt').update(is_active=False)
+
+    result = run_import(CSV.replace(',3,', ',7,').replace('Cotton shirt', 'Linen shirt'))
+
+    assert result.imported == 0
+    assert [error['error'] for error in result.errors] == ['Cannot import variants for inactive product'] * 2
+    assert Product.objects.get(slug='shirt').description == 'Cotton shirt'
+    assert ProductVariant.objects.get(sku='SHIRT-S').stock_quantity == 3
@@ -0,0 +1,78 @@
+from base64 import b64encode
+from urllib.parse import urlencode
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+import json
+import pytest
+
+from store.catalog import refresh_products
+from store.filters import ProductSearchFilter
+from store.models import Product
+
+
+def walk(client, url, link='next'):
+    """Slugs of every page reached by following ``link`` from ``url``."""
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        pages.append([product['slug'] for product in data['results']])
+        url = data[link]
+    return pages
+
+
+def last_url(client, url):
+    while True:
+        data = client.get(url).json()
+        if not data['next']:
+            return url
+        url = data['next']
+
+
+def encode_position(values):
+    return b64encode(urlencode({'p': json.dumps(values)}).encode()).decode()
+
+
+@pytest.mark.parametrize('ordering, order_by', [
+    ('', ('-created_at', '-id')),
+    ('name', ('name', 'id')),
+    # Every product has the same base price, so only the id breaks ties
+    ('-base_price', ('-base_price', '-id')),
+])
+def test_pages_cover_the_ordering_forward_and_backward(client, catalog, ordering, order_by):
+    expected = list(Product.objects.order_by(*order_by).values_list('slug', flat=True))
+    url = f'/api/store/products/?page_size=2&ordering={ordering}'
+
+    pages = walk(client, url)
+    assert [slug for page in pages for slug in page] == expected
+    assert [len(page) for page in pages] == [2, 2, 2, 2, 1]
+
+    backward = walk(client, last_url(client, url), link='previous')
+    assert backward == list(reversed(pages))
+
+
+def test_search_results_page_by_rank(client, catalog):
+    Product.objects.filter(slug='product-1-1').update(name='Product Product')
+    refresh_products([product.pk for product in catalog])
+
+    request = Request(APIRequestFactory().get('/', {'search': 'product'}))
+    expected = list(ProductSearchFilter().filter_queryset(
+        request, Product.objects.all(), None
+    ).order_by('-search_rank', '-id').values_list('slug', flat=True))
+    assert len(expected) == len(catalog)
+    assert expected[0] == 'product-1-1'
+
+    pages = walk(client, '/api/store/products/?page_size=4&search=product')
+    assert [slug for page in pages for slug in page] == expected
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-base64!',
+    encode_position(['not a date', 1]),
+    encode_position(['2024-01-01T00:00:00+00:00']),
+    encode_position([{'a': 1}, 1]),
+])
+def test_tampered_cursor_is_not_found(client, catalog, cursor):
+    response = client.get('/api/store/products/', {'cursor': cursor})
+    assert response.status_code == 404
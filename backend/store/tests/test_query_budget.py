@@ -0,0 +1,28 @@
+import pytest
+
+from store.prefetch import QueryBudgetExceeded
+
+
+@pytest.mark.parametrize('url', [
+    '/api/store/categories/',
+    '/api/store/categories/level-0/',
+    '/api/store/categories/level-0/?include_products=true',
+    '/api/store/products/',
+    '/api/store/products/product-2-0/',
+])
+def test_catalog_reads_fit_query_budget(client, catalog, url):
+    # Nested categories and variants must come from prefetches or the category
+    # tree, not a query per row
+    response = client.get(url)
+    assert response.status_code == 200
+
+
+def test_query_budget_fails_views_over_budget(client, catalog, settings):
+    settings.STORE_QUERY_BUDGET = 1
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/api/store/products/product-2-0/')
+
+
+def test_query_budget_is_off_without_setting(client, catalog, settings):
+    settings.STORE_QUERY_BUDGET = None
+    assert client.get('/api/store/products/product-2-0/').status_code == 200
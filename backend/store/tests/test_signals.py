@@ -0,0 +1,30 @@
+from decimal import Decimal
+import pytest
+
+from store.models import Category, Product, ProductCard
+
+
+@pytest.fixture
+def tree(db):
+    """Two roots; the child starts out under the first one, which holds a product."""
+    old_parent = Category.objects.create(name='Old parent', slug='old-parent')
+    new_parent = Category.objects.create(name='New parent', slug='new-parent')
+    child = Category.objects.create(name='Child', slug='child', parent=old_parent)
+    product = Product.objects.create(
+        category=old_parent, name='Product', slug='product', description='Product', base_price=Decimal('10.00')
+    )
+    return old_parent, new_parent, child, product
+
+
+def test_moving_a_category_refreshes_its_old_ancestors(tree, django_capture_on_commit_callbacks):
+    old_parent, new_parent, child, product = tree
+    old_version = Category.objects.get(pk=old_parent.pk).version
+
+    with django_capture_on_commit_callbacks(execute=True):
+        child = Category.objects.get(pk=child.pk)
+        child.parent = new_parent
+        child.save()
+
+    assert Category.objects.get(pk=old_parent.pk).version > old_version
+    card = ProductCard.objects.get(product=product)
+    assert card.data['category']['children'] == []
@@ -0,0 +1,48 @@
+from decimal import Decimal
+import pytest
+
+from store.models import Category, Product, ProductVariant, attributes_signature
+
+
+@pytest.fixture
+def product(db):
+    category = Category.objects.create(name='Shirts', slug='shirts')
+    product = Product.objects.create(
+        category=category, name='Shirt', slug='shirt', description='Shirt', base_price=Decimal('10.00')
+    )
+    for size in ('S', 'M'):
+        ProductVariant.objects.create(product=product, sku=f'SHIRT-{size}', attributes={'size': size})
+    return product
+
+
+def test_find_variant_matches_attributes_like_the_filters(client, product):
+    response = client.get('/api/store/products/shirt/find-variant/?attr.size=M')
+    assert response.status_code == 200
+    assert response.json()['sku'] == 'SHIRT-M'
+    # attr.size=m matches no variant in the product list either
+    assert client.get('/api/store/products/shirt/find-variant/?attr.size=m').status_code == 404
+    assert client.get('/api/store/products/?attr.size=m').json()['results'] == []
+
+
+def test_signature_depends_on_values_not_key_order():
+    assert attributes_signature({'size': 'M', 'color': 'Red'}) == attributes_signature({'color': 'Red', 'size': 'M'})
+    assert attributes_signature({'size': 'M'}) != attributes_signature({'size': 'm'})
+    assert attributes_signature({'size': 1}) != attributes_signature({'size': '1'})
+
+
+def test_refresh_attribute_signatures_backfills_existing_rows(product):
+    ProductVariant.objects.update(attribute_signature=None)
+    # Stored before the constraint existed: a second variant with the same attributes
+    duplicate = ProductVariant.objects.create(product=product, sku='SHIRT-M-2', attributes={'size': 'L'})
+    ProductVariant.objects.filter(pk=duplicate.pk).update(attributes={'size': 'M'}, attribute_signature=None)
+
+    updated, duplicates = ProductVariant.refresh_attribute_signatures()
+
+    assert (updated, duplicates) == (2, [duplicate.pk])
+    signatures = dict(ProductVariant.objects.values_list('sku', 'attribute_signature'))
+    assert signatures == {
+        'SHIRT-S': attributes_signature({'size': 'S'}),
+        'SHIRT-M': attributes_signature({'size': 'M'}),
+        'SHIRT-M-2': None,
+    }
+    assert ProductVariant.refresh_attribute_signatures() == (0, [duplicate.pk])
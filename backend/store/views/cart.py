@@ -5,10 +5,13 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError as DRFValidationError
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from drf_spectacular.utils import extend_schema
 from decimal import Decimal
 import logging
 
-from ..models import Cart, CartItem
+from .mixins import QueryBudgetMixin, FIELD_SELECTION_PARAMETERS
+from ..models import Cart, CartItem, ProductVariant
+from ..prefetch import plan_queryset
 from ..serializers import (
     CartItemRequestSerializer,
     CartItemResponseSerializer,
@@ -17,7 +20,7 @@ from ..serializers import (
 
 logger = logging.getLogger(__name__)
 
-class CartViewSet(viewsets.GenericViewSet):
+class CartViewSet(QueryBudgetMixin, viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated]
     queryset = Cart.objects.none()
     
@@ -25,17 +28,17 @@ class CartViewSet(viewsets.GenericViewSet):
         if getattr(self, 'swagger_fake_view', False):
             return Cart.objects.none()
 
-        return Cart.objects.filter(
-            user=self.request.user,
-            is_active=True
-        ).prefetch_related(
-            'items__variant__product',
-            'items__variant__images'
+        return plan_queryset(
+            Cart.objects.filter(user=self.request.user, is_active=True),
+            CartResponseSerializer,
+            context=self.get_serializer_context()
         )
 
     def get_object(self):
         """Get or create active cart for current user."""
-        cart, _ = Cart.objects.get_or_create(
+        # Only the read path needs the prefetch plan; writes update the totals by delta
+        queryset = self.get_queryset() if self.action == 'list' else Cart.objects.all()
+        cart, _ = queryset.get_or_create(
             user=self.request.user,
             is_active=True,
             defaults={'total_amount': Decimal('0.00')}
@@ -54,13 +57,15 @@ class CartViewSet(viewsets.GenericViewSet):
             )
         return super().handle_exception(exc)
 
+    @extend_schema(parameters=FIELD_SELECTION_PARAMETERS)
     def list(self, request):
         """Get current user's active cart."""
         cart = self.get_object()
         serializer = self.get_serializer(cart)
         data = serializer.data
         # Ensure total_amount is formatted as string with 2 decimal places
-        data['total_amount'] = '{:.2f}'.format(cart.total_amount)
+        if 'total_amount' in data:
+            data['total_amount'] = '{:.2f}'.format(cart.total_amount)
         return Response(data)
 
     @action(detail=False, methods=['post'])
@@ -78,7 +83,8 @@ class CartViewSet(viewsets.GenericViewSet):
                 variant_id = serializer.validated_data['variant_id']
                 quantity = serializer.validated_data.get('quantity', 1)
                 
-                cart_item = cart.add_item(variant_id=variant_id, quantity=quantity)
+                variant = ProductVariant.objects.select_related('product').get(pk=variant_id)
+                cart_item = cart.add_item(variant, quantity)
                 logger.info(f'Added item to cart: user={request.user.id}, variant={variant_id}')
                 return Response(
                     CartItemResponseSerializer(cart_item).data, 
@@ -99,7 +105,7 @@ class CartViewSet(viewsets.GenericViewSet):
         quantity = int(request.data.get('quantity', 1))
         
         try:
-            cart_item = cart.items.get(id=item_id)
+            cart_item = cart.items.select_related('variant__product').get(id=item_id)
             if quantity > 0:
                 updated_item = cart.update_item(cart_item.variant, quantity)
                 if updated_item:
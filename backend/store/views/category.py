@@ -1,20 +1,27 @@
-from rest_framework import viewsets, serializers, filters
+from rest_framework import viewsets, serializers, filters, status
+from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.settings import api_settings
 from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
 from django.core.exceptions import ValidationError
-from django.db.models import Q, Prefetch, Count
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from django.db.models import Q
 from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, extend_schema_view, inline_serializer
 import logging
 
+from .mixins import QueryBudgetMixin, ConditionalGetMixin
+from ..caching import (
+    CATEGORY_TAG, COUNTER_TAG, PRODUCT_TAG, get_catalog_version, get_tag_versions, get_tagged_payload
+)
+from ..category_tree import get_category_tree
+from ..counters import get_counters
 from ..models import Category, Product
+from ..prefetch import plan_queryset
 from ..serializers import (
     CategoryRequestSerializer, 
-    CategoryResponseSerializer, 
+    CategoryDetailResponseSerializer,
     ProductResponseSerializer
 )
 
@@ -29,16 +36,18 @@ logger = logging.getLogger(__name__)
                 'count': serializers.IntegerField(),
                 'next': serializers.URLField(allow_null=True),
                 'previous': serializers.URLField(allow_null=True),
-                'results': CategoryResponseSerializer(many=True),
+                'results': CategoryDetailResponseSerializer(many=True),
             }
         )
     ),
     retrieve=extend_schema(
         description="Get category details",
-        responses=CategoryResponseSerializer
+        responses=CategoryDetailResponseSerializer
     )
 )
-class CategoryViewSet(viewsets.GenericViewSet,
+class CategoryViewSet(QueryBudgetMixin,
+                     ConditionalGetMixin,
+                     viewsets.GenericViewSet,
                      ListModelMixin,
                      RetrieveModelMixin):
     """
@@ -67,31 +76,10 @@ class CategoryViewSet(viewsets.GenericViewSet,
         if getattr(self, 'swagger_fake_view', False):
             return Category.objects.none()
 
-        # Base queryset with active categories
+        # Base queryset with active categories; product and variant counts are
+        # maintained on the rows by store.counters
         queryset = Category.objects.filter(is_active=True)
-
-        # Include product counts and active products
-        queryset = queryset.annotate(
-            total_products=Count('products', filter=Q(products__is_active=True)),
-            active_variants=Count(
-                'products__variants',
-                filter=Q(
-                    products__is_active=True,
-                    products__variants__is_active=True,
-                    products__variants__stock_quantity__gt=0
-                )
-            )
-        )
-
-        # Add prefetch related for products if needed
-        if self.action == 'retrieve':
-            queryset = queryset.prefetch_related(
-                Prefetch(
-                    'products',
-                    queryset=Product.objects.filter(is_active=True).select_related('category')
-                ),
-                'children'
-            )
+        queryset = plan_queryset(queryset, CategoryDetailResponseSerializer)
 
         # Handle search
         search = self.request.query_params.get('search')
@@ -117,26 +105,143 @@ class CategoryViewSet(viewsets.GenericViewSet,
         """
         if self.action in ['create', 'update', 'partial_update']:
             return CategoryRequestSerializer
-        return CategoryResponseSerializer
+        return CategoryDetailResponseSerializer
+
+    def get_etag_queryset(self):
+        return Category.objects.filter(is_active=True)
+
+    def get_tree_row(self):
+        """The requested active category from the category tree snapshot, or None."""
+        row = get_category_tree().get_by_slug(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return row if row is not None and row['is_active'] else None
+
+    def get_row_counters(self, row):
+        """Counters of a tree row's category, read once per request."""
+        if not hasattr(self, '_counters'):
+            self._counters = get_counters([row['id']]).get(row['id'], {})
+        return self._counters
+
+    def get_object_version(self):
+        row = self.get_tree_row()
+        if row is None:
+            return None
+        # Counters change without bumping the category version
+        return (row['id'], row['version'], row['updated_at'], *self.get_row_counters(row).values())
+
+    def filter_tree_rows(self, request, rows):
+        """Apply the search, parent and ordering parameters to category tree rows."""
+        rows = [row for row in rows if row['is_active']]
+
+        terms = [term.lower() for term in filters.SearchFilter().get_search_terms(request)]
+        for term in terms:
+            rows = [
+                row for row in rows
+                if any(term in row[field].lower() for field in self.search_fields)
+            ]
+
+        parent = request.query_params.get('parent')
+        if parent == 'null':
+            rows = [row for row in rows if row['parent_id'] is None]
+        elif parent:
+            parent_row = get_category_tree().get_by_slug(parent)
+            rows = [row for row in rows if parent_row and row['parent_id'] == parent_row['id']]
+
+        ordering = filters.OrderingFilter().get_ordering(request, Category.objects.none(), self)
+        # Stable sorts from the last key to the first give a multi-key ordering
+        for term in reversed(ordering or []):
+            field = term.lstrip('-')
+            rows = sorted(rows, key=lambda row: row[field], reverse=term.startswith('-'))
+        return rows
+
+    # Everything the list embeds; the same versions key its ETag and its cache entry
+    list_cache_tags = (CATEGORY_TAG, PRODUCT_TAG, COUNTER_TAG)
+
+    def get_list_version(self):
+        return (get_catalog_version(), get_tag_versions(self.list_cache_tags))
 
-    @method_decorator(cache_page(60 * 15))  # Cache for 15 minutes
     def list(self, request, *args, **kwargs):
         """
-        Get list of categories with caching.
+        Get list of categories, answering 304 while nothing it embeds changed.
         """
-        return super().list(request, *args, **kwargs)
+        return self.respond_conditionally(
+            request, self.get_list_version(), self.cached_list, *args, **kwargs
+        )
+
+    def get_list_cache_params(self, request):
+        """The query parameters the list depends on, in a canonical order."""
+        names = {
+            api_settings.SEARCH_PARAM,
+            api_settings.ORDERING_PARAM,
+            'parent',
+            self.paginator.page_query_param if self.paginator else None,
+        }
+        return sorted(
+            (name, value)
+            for name in names if name
+            for value in request.query_params.getlist(name)
+        )
+
+    def cached_list(self, request, *args, **kwargs):
+        """
+        Get list of categories from the tagged cache, which Category and Product
+        changes purge.
+        """
+        data = get_tagged_payload(
+            'category-list',
+            (
+                get_catalog_version(),
+                request.build_absolute_uri('/'),
+                self.get_list_cache_params(request),
+            ),
+            self.list_cache_tags,
+            lambda: self.build_list(request).data
+        )
+        return Response(data)
+
+    def build_list(self, request):
+        """
+        Get list of categories from the in-process category tree, reading only
+        the counters of the returned categories.
+        """
+        tree = get_category_tree()
+        rows = self.filter_tree_rows(request, tree.rows)
+        page = self.paginate_queryset(rows)
+        rows = page if page is not None else rows
+        counters = get_counters([row['id'] for row in rows])
+        data = [tree.get_detail_payload(row['id'], counters.get(row['id'], {})) for row in rows]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
 
     def retrieve(self, request, *args, **kwargs):
+        """
+        Get category details, answering 304 while nothing it embeds changed.
+        """
+        version = self.get_object_version()
+        if version is not None and request.query_params.get('include_products') == 'true':
+            # Embedded products change independently of the category itself
+            version = (version, self.get_list_version())
+        return self.respond_conditionally(
+            request, version, self.retrieve_with_products, *args, **kwargs
+        )
+
+    def retrieve_with_products(self, request, *args, **kwargs):
         """
         Get detailed category information including products.
         """
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
+        row = self.get_tree_row()
+        if row is None:
+            # Not in the snapshot; get_object() raises the usual 404
+            data = dict(self.get_serializer(self.get_object()).data)
+        else:
+            data = get_category_tree().get_detail_payload(row['id'], self.get_row_counters(row))
 
         # Add additional product information if requested
         if request.query_params.get('include_products') == 'true':
-            products = instance.products.filter(is_active=True)
+            products = plan_queryset(
+                Product.objects.filter(category_id=data['id'], is_active=True),
+                ProductResponseSerializer
+            )
             data['products'] = ProductResponseSerializer(products, many=True).data
 
         return Response(data)
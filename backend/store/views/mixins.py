@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.utils.http import parse_etags, quote_etag
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import status
+from rest_framework.response import Response
+import hashlib
+
+from ..caching import get_catalog_version, get_versioned_payload
+from ..prefetch import query_budget
+from ..serializers.base import FIELDS_PARAM, EXPAND_PARAM
+
+# Query parameters understood by serializers using DynamicFieldsMixin
+FIELD_SELECTION_PARAMETERS = [
+    OpenApiParameter(
+        FIELDS_PARAM, str, required=False,
+        description='Comma-separated fields to return; dotted names select nested fields'
+    ),
+    OpenApiParameter(
+        EXPAND_PARAM, str, required=False,
+        description='Comma-separated relations to render as nested objects instead of ids'
+    ),
+]
+
+
+class QueryBudgetMixin:
+    """
+    Fail read requests that issue more than a fixed number of queries.
+
+    Enabled by the STORE_QUERY_BUDGET setting, which config.test_settings turns
+    on, so that missing prefetches fail the tests instead of adding silent N+1
+    queries.
+    """
+    query_budget = None
+
+    def get_query_budget(self):
+        if self.query_budget is not None:
+            return self.query_budget
+        return getattr(settings, 'STORE_QUERY_BUDGET', None)
+
+    def dispatch(self, request, *args, **kwargs):
+        budget = self.get_query_budget()
+        if not budget or request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        with query_budget(budget, label=f'{self.__class__.__name__} {request.method} {request.path}'):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETags and 304 Not Modified responses for read endpoints.
+
+    Detail ETags derive from the object's ``version`` counter, which is bumped
+    whenever anything embedded in its payload changes. List ETags derive from the
+    catalog-wide version kept in the cache. The same object version keys the
+    cached detail payloads.
+    """
+    etag_version_fields = ('pk', 'version', 'updated_at')
+
+    def get_etag_queryset(self):
+        return self.get_queryset().model._default_manager.all()
+
+    def get_object_version(self):
+        """Version token of the requested object from one indexed lookup, or None."""
+        if not hasattr(self, '_object_version'):
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            self._object_version = self.get_etag_queryset().filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list(*self.etag_version_fields).first()
+        return self._object_version
+
+    def get_cached_object_data(self):
+        """Serialized payload of the requested object, cached under its version."""
+        version = self.get_object_version()
+        if version is None:
+            # Let get_object() raise the usual 404
+            return self.get_serializer(self.get_object()).data
+
+        return get_versioned_payload(
+            self.get_etag_queryset().model._meta.model_name,
+            (
+                version,
+                self.request.build_absolute_uri('/'),
+                self.request.query_params.get(FIELDS_PARAM),
+                self.request.query_params.get(EXPAND_PARAM),
+            ),
+            lambda: dict(self.get_serializer(self.get_object()).data)
+        )
+
+    def get_list_version(self):
+        return get_catalog_version()
+
+    def make_etag(self, request, version):
+        token = ':'.join([
+            self.__class__.__name__,
+            str(version),
+            request.get_full_path(),
+            request.accepted_renderer.format,
+        ])
+        return quote_etag(hashlib.sha1(token.encode('utf-8')).hexdigest())
+
+    def respond_conditionally(self, request, version, handler, *args, **kwargs):
+        """Return 304 when If-None-Match matches, otherwise run ``handler`` and tag it."""
+        if version is None:
+            return handler(request, *args, **kwargs)
+
+        etag = self.make_etag(request, version)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
@@ -9,26 +9,38 @@ from rest_framework.mixins import (
     UpdateModelMixin,
     ListModelMixin
 )
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, extend_schema_view
 import logging
 
+from .mixins import QueryBudgetMixin, FIELD_SELECTION_PARAMETERS
 from ..models import Order, Cart
+from ..pagination import KeysetPagination
+from ..prefetch import plan_queryset
 from ..serializers import (
     CreateOrderRequestSerializer,
     UpdateOrderRequestSerializer,
     OrderResponseSerializer,
 )
+from ..serializers.base import has_field_selection
+from ..serializers.compiled import compile_orders
 
 logger = logging.getLogger(__name__)
 
-class OrderViewSet(viewsets.GenericViewSet,
+@extend_schema_view(
+    list=extend_schema(parameters=FIELD_SELECTION_PARAMETERS),
+    retrieve=extend_schema(parameters=FIELD_SELECTION_PARAMETERS),
+)
+class OrderViewSet(QueryBudgetMixin,
+                  viewsets.GenericViewSet,
                   CreateModelMixin,
                   RetrieveModelMixin,
                   UpdateModelMixin,
                   ListModelMixin):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     queryset = Order.objects.none()
     
     def get_permissions(self):
@@ -40,10 +52,11 @@ class OrderViewSet(viewsets.GenericViewSet,
         if getattr(self, 'swagger_fake_view', False):
             return Order.objects.none()
 
-        queryset = Order.objects.prefetch_related(
-            'items__variant__product',
-            'items__variant__images'
-        ).select_related('user').order_by('-created_at')
+        queryset = plan_queryset(
+            Order.objects.select_related('user'),
+            OrderResponseSerializer,
+            context=self.get_serializer_context()
+        ).order_by('-created_at')
 
         # Admin users can see all orders
         if not self.request.user.is_staff:
@@ -51,6 +64,21 @@ class OrderViewSet(viewsets.GenericViewSet,
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if not settings.STORE_COMPILED_SERIALIZERS or has_field_selection(request):
+            return super().list(request, *args, **kwargs)
+
+        # Paginate bare orders and build the page from .values() rows
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        page = self.paginate_queryset(queryset)
+        orders = page if page is not None else list(queryset)
+        payloads = compile_orders([order.pk for order in orders], request=request)
+        data = [payloads[order.pk] for order in orders]
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
     def get_serializer_class(self):
         if self.action == 'create':
             return CreateOrderRequestSerializer
@@ -10,26 +10,60 @@ from rest_framework.mixins import (
     DestroyModelMixin,
     ListModelMixin
 )
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.exceptions import ValidationError
-from django.db.models import Prefetch, Q
-from django.db import transaction
+from django.db.models import DecimalField, Exists, ExpressionWrapper, F, OuterRef, Q, TextField
+from django.db.models.functions import Cast
+from django.db import IntegrityError, transaction
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+import hashlib
+import json
 import logging
 
-from ..models import Product, ProductVariant, ProductImage
+from .mixins import QueryBudgetMixin, ConditionalGetMixin, FIELD_SELECTION_PARAMETERS
+from ..models import Category, Product, ProductVariant, ProductImage, StockHistory, attributes_signature
+from ..catalog import absolutize_card_urls, refresh_product_cards
+from ..images import schedule_derivatives, release_image_file
+from ..importers import upsert_variants
+from ..filters import ProductFilter, ProductSearchFilter, ProductAttributeFilter, ProductOrderingFilter
+from ..pagination import KeysetPagination
+from ..prefetch import plan_queryset
+from ..renderers import JSONFragment
 from ..serializers import (
     ProductRequestSerializer,
     ProductResponseSerializer,
+    ProductCardSerializer,
     ProductDetailResponseSerializer,
     ProductImageRequestSerializer,
     ProductImageResponseSerializer,
     ProductVariantRequestSerializer,
     ProductVariantResponseSerializer,
+    ProductVariantBulkRequestSerializer,
+    StockHistoryResponseSerializer,
 )
+from ..serializers.base import has_field_selection
+from ..signals import schedule_product_refresh
 
 logger = logging.getLogger(__name__)
 
-class ProductViewSet(viewsets.GenericViewSet,
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_LIMIT = 5
+SUGGEST_MAX_LIMIT = 10
+SUGGEST_CACHE_TIMEOUT = 60
+# Files validated and written to storage concurrently per upload request
+UPLOAD_WORKERS = 4
+# Actions that open their own short transactions instead of running in the request one
+NON_ATOMIC_ACTIONS = {'upload_images'}
+
+class ProductViewSet(QueryBudgetMixin,
+                    ConditionalGetMixin,
+                    viewsets.GenericViewSet,
                     CreateModelMixin,
                     RetrieveModelMixin,
                     UpdateModelMixin,
@@ -39,18 +73,30 @@ class ProductViewSet(viewsets.GenericViewSet,
     ViewSet for Product model providing full CRUD operations.
     """
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'is_active']
-    search_fields = ['name', 'description', 'variants__sku']
-    ordering_fields = ['name', 'created_at', 'base_price']
+    filter_backends = [
+        DjangoFilterBackend,
+        ProductSearchFilter,
+        ProductAttributeFilter,
+        ProductOrderingFilter,
+    ]
+    filterset_class = ProductFilter
+    ordering_fields = ['name', 'created_at', 'base_price', 'price']
     ordering = ['-created_at']
 
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if actions and set(actions.values()) <= NON_ATOMIC_ACTIONS:
+            view = transaction.non_atomic_requests(view)
+        return view
+
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions based on action.
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'suggest', 'find_variant']:
             return [AllowAny()]
         return [IsAdminUser()]
 
@@ -61,25 +107,62 @@ class ProductViewSet(viewsets.GenericViewSet,
         if getattr(self, 'swagger_fake_view', False):
             return Product.objects.none()
 
-        queryset = Product.objects.select_related('category')
-        
-        if self.action in ['retrieve', 'update']:
-            queryset = queryset.prefetch_related(
-                Prefetch('variants', queryset=ProductVariant.objects.filter(is_active=True)),
-                Prefetch('images', queryset=ProductImage.objects.filter(is_active=True).order_by('order')),
+        if self.action == 'list' and has_field_selection(self.request):
+            # Sparse fieldsets are serialized directly, loading only what is rendered
+            queryset = plan_queryset(
+                Product.objects.defer('search_vector'),
+                ProductResponseSerializer,
+                context=self.get_serializer_context()
             )
+        elif self.action == 'list':
+            # The list is served from the denormalized ProductCard documents, read as
+            # JSON text so the renderer can splice them in without decoding
+            queryset = Product.objects.annotate(
+                card_json=Cast('card__data', TextField())
+            ).defer('search_vector')
+        else:
+            queryset = Product.objects.select_related('category')
         
-        # Filter by price range
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
+        if self.action in ['retrieve', 'update']:
+            queryset = plan_queryset(queryset, ProductDetailResponseSerializer, overrides={
+                'variants': ProductVariant.objects.filter(is_active=True),
+                'images': ProductImage.objects.filter(is_active=True).order_by('order'),
+            }, context=self.get_serializer_context())
         
-        if min_price:
-            queryset = queryset.filter(base_price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(base_price__lte=max_price)
-            
+        # Filter by final variant price: products with an active variant in range
+        min_price = self.get_price_param('min_price')
+        max_price = self.get_price_param('max_price')
+
+        if min_price is not None or max_price is not None:
+            variants = ProductVariant.objects.filter(product=OuterRef('pk'), is_active=True).annotate(
+                final_price=ExpressionWrapper(
+                    OuterRef('base_price') + F('price_adjustment'), output_field=DecimalField()
+                )
+            )
+            # The maintained, indexed price range narrows the candidates first
+            if min_price is not None:
+                queryset = queryset.filter(max_final_price__gte=min_price)
+                variants = variants.filter(final_price__gte=min_price)
+            if max_price is not None:
+                queryset = queryset.filter(min_final_price__lte=max_price)
+                variants = variants.filter(final_price__lte=max_price)
+            queryset = queryset.filter(Exists(variants))
+
         return queryset
 
+    def get_price_param(self, name):
+        """A price query parameter as a Decimal, None when absent."""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            price = Decimal(value)
+        except InvalidOperation:
+            price = None
+        if price is None or not price.is_finite():
+            raise DRFValidationError({name: 'A valid number is required.'})
+        return price
+
     def get_serializer_class(self):
         """
         Return appropriate serializer class based on action.
@@ -90,6 +173,196 @@ class ProductViewSet(viewsets.GenericViewSet,
             return ProductDetailResponseSerializer
         return ProductResponseSerializer
 
+    @extend_schema(
+        description=(
+            "List products, cursor-paginated: follow the next/previous links, "
+            "there is no total count. ?facets=true adds a 'facets' object with "
+            "per-attribute value counts."
+        ),
+        parameters=FIELD_SELECTION_PARAMETERS,
+        responses=ProductCardSerializer(many=True)
+    )
+    def list(self, request, *args, **kwargs):
+        """
+        List products, answering 304 while the catalog version is unchanged.
+        """
+        return self.respond_conditionally(
+            request, self.get_list_version(), self.list_cards, *args, **kwargs
+        )
+
+    @extend_schema(parameters=FIELD_SELECTION_PARAMETERS)
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get product details, answering 304 while the product version is unchanged.
+        """
+        return self.respond_conditionally(
+            request, self.get_object_version(), self.retrieve_cached, *args, **kwargs
+        )
+
+    def retrieve_cached(self, request, *args, **kwargs):
+        """
+        Get product details from the versioned payload cache.
+        """
+        return Response(self.get_cached_object_data())
+
+    def list_cards(self, request, *args, **kwargs):
+        """
+        List products using their pre-built ProductCard documents, or through the
+        serializer when the request selects fields.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        products = list(page if page is not None else queryset)
+
+        if has_field_selection(request):
+            data = self.get_serializer(products, many=True).data
+        else:
+            data = self.get_card_data(products)
+
+        if page is not None:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response(data)
+
+        # Per-attribute counts for the filtered catalog, computed on request
+        if request.query_params.get('facets') == 'true':
+            facets = ProductAttributeFilter().get_facets(self.get_facet_queryset(), request)
+            if page is not None:
+                response.data['facets'] = facets
+            else:
+                response.data = {'results': data, 'facets': facets}
+        return response
+
+    def get_facet_queryset(self):
+        """The list queryset with every filter applied except the attribute filters."""
+        queryset = self.get_queryset()
+        for backend in self.filter_backends:
+            if not issubclass(backend, ProductAttributeFilter):
+                queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+    def get_card_data(self, products):
+        """
+        Pre-built ProductCard documents of the given products, in order.
+        """
+        cards = {
+            product.pk: product.card_json
+            for product in products if product.card_json is not None
+        }
+
+        # Cards are normally maintained by signals; build any that are missing
+        missing = [product.pk for product in products if product.pk not in cards]
+        if missing:
+            cards.update({
+                card.product_id: json.dumps(card.data, cls=DjangoJSONEncoder)
+                for card in refresh_product_cards(missing)
+            })
+
+        return [
+            JSONFragment(absolutize_card_urls(cards[product.pk], self.request))
+            for product in products if product.pk in cards
+        ]
+
+    @extend_schema(
+        description="Typo-tolerant autocomplete over product names, SKUs and categories",
+        parameters=[
+            OpenApiParameter('q', str, required=True),
+            OpenApiParameter('limit', int, required=False),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Return the closest product names, SKUs and category names for a prefix.
+        """
+        query = ' '.join(request.query_params.get('q', '').split()).lower()
+        if len(query) < SUGGEST_MIN_LENGTH:
+            return Response({'products': [], 'skus': [], 'categories': []})
+
+        try:
+            limit = int(request.query_params.get('limit', SUGGEST_LIMIT))
+        except ValueError:
+            limit = SUGGEST_LIMIT
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+
+        cache_key = 'store:suggest:{}:{}'.format(
+            limit, hashlib.md5(query.encode('utf-8')).hexdigest()
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            # trigram_word_similar compiles to the %> operator served by the gin_trgm_ops indexes
+            products = Product.objects.filter(
+                is_active=True,
+                name__trigram_word_similar=query
+            ).annotate(
+                similarity=TrigramWordSimilarity(query, 'name')
+            ).order_by('-similarity').values('name', 'slug')[:limit]
+
+            skus = ProductVariant.objects.filter(
+                is_active=True,
+                product__is_active=True,
+                sku__trigram_word_similar=query
+            ).annotate(
+                similarity=TrigramWordSimilarity(query, 'sku'),
+                product_slug=F('product__slug')
+            ).order_by('-similarity').values('sku', 'product_slug')[:limit]
+
+            categories = Category.objects.filter(
+                is_active=True,
+                name__trigram_word_similar=query
+            ).annotate(
+                similarity=TrigramWordSimilarity(query, 'name')
+            ).order_by('-similarity').values('name', 'slug')[:limit]
+
+            data = {
+                'products': list(products),
+                'skus': list(skus),
+                'categories': list(categories),
+            }
+            cache.set(cache_key, data, SUGGEST_CACHE_TIMEOUT)
+
+        return Response(data)
+
+    @extend_schema(
+        description="Find the active variant with exactly the given attributes, "
+                    "e.g. ?attr.size=M&attr.color=Red",
+        parameters=[
+            OpenApiParameter('attr.<name>', str, required=False, description='Attribute value'),
+        ],
+        responses={200: ProductVariantResponseSerializer}
+    )
+    @action(detail=True, methods=['get'], url_path='find-variant')
+    def find_variant(self, request, slug=None):
+        """
+        Look up a product's variant by its attributes for size/color pickers,
+        through the (product, attribute signature) unique index.
+        """
+        attribute_filters = ProductAttributeFilter().get_attribute_filters(request)
+        if any(len(values) > 1 for values in attribute_filters.values()):
+            return Response(
+                {'error': 'Only one value per attribute is allowed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        attributes = {name: values[0] for name, values in attribute_filters.items()}
+
+        queryset = ProductVariant.objects.filter(
+            product__slug=slug,
+            product__is_active=True,
+            attribute_signature=attributes_signature(attributes),
+            is_active=True
+        )
+        variant = plan_queryset(queryset, ProductVariantResponseSerializer, overrides={
+            'images': ProductImage.objects.filter(is_active=True).order_by('order'),
+        }).first()
+        if variant is None:
+            return Response(
+                {'error': 'No variant with these attributes'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(
+            ProductVariantResponseSerializer(variant, context=self.get_serializer_context()).data
+        )
+
     @transaction.atomic
     def perform_create(self, serializer):
         """
@@ -152,56 +425,96 @@ class ProductViewSet(viewsets.GenericViewSet,
             )
 
     @action(detail=True, methods=['post'])
-    @transaction.atomic
     def upload_images(self, request, slug=None):
         """
         Upload images for the product.
+
+        Files are validated and written to storage in parallel with no transaction
+        open; the rows are then inserted in one short transaction.
         """
         product = self.get_object()
-        images = request.FILES.getlist('images')
+        uploads = request.FILES.getlist('images')
         
-        if not images:
+        if not uploads:
             return Response(
                 {'error': 'No images provided'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        image_data = []
-        errors = []
-        
-        for image in images:
-            serializer = ProductImageRequestSerializer(data={
-                'image': image,
-                'alt_text': request.data.get('alt_text', product.name),
-                'type': request.data.get('type', 'gallery')
-            })
-            
-            try:
-                if serializer.is_valid():
-                    image_obj = serializer.save(product=product)
-                    response_serializer = ProductImageResponseSerializer(image_obj)
-                    image_data.append(response_serializer.data)
-                    logger.info(f'Added image to product {product.name} (type: {image_obj.type})')
-                else:
-                    errors.append(serializer.errors)
-            except ValidationError as e:
-                errors.append(str(e))
-                logger.error(f'Error uploading image: {str(e)}')
-
-        if errors and not image_data:
+        alt_text = request.data.get('alt_text', product.name)
+        image_type = request.data.get('type', 'gallery')
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(uploads))) as executor:
+            results = list(executor.map(
+                lambda upload: self.store_upload(product, upload, alt_text, image_type),
+                uploads
+            ))
+
+        images = [image for image, error in results if image is not None]
+        errors = [error for image, error in results if error is not None]
+
+        main_images = [image for image in images if image.type == 'main']
+        if main_images and (len(main_images) > 1 or product.images.filter(type='main', is_active=True).exists()):
+            errors.append({'type': ['Product already has a main image']})
+            self.delete_stored(main_images)
+            images = [image for image in images if image.type != 'main']
+
+        try:
+            with transaction.atomic():
+                images = ProductImage.objects.bulk_create(images)
+                # bulk_create skips post_save, so trigger the change handlers here
+                schedule_product_refresh(product.pk)
+                image_ids = [image.pk for image in images]
+                transaction.on_commit(lambda: schedule_derivatives(*image_ids))
+        except (IntegrityError, ValidationError) as e:
+            logger.error(f'Error uploading images: {str(e)}')
+            self.delete_stored(images)
+            return Response({'errors': errors + [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        if errors and not images:
             return Response(
                 {'errors': errors},
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
+
+        logger.info(f'Added {len(images)} images to product {product.name}')
         return Response(
             {
-                'images': image_data,
+                'images': ProductImageResponseSerializer(
+                    images, many=True, context=self.get_serializer_context()
+                ).data,
                 'errors': errors if errors else None
             },
-            status=status.HTTP_201_CREATED if image_data else status.HTTP_400_BAD_REQUEST
+            status=status.HTTP_201_CREATED if images else status.HTTP_400_BAD_REQUEST
         )
 
+    def store_upload(self, product, upload, alt_text, image_type):
+        """
+        Validate one uploaded file and write it to storage without touching the
+        database. Returns ``(unsaved ProductImage, None)`` or ``(None, errors)``.
+        """
+        serializer = ProductImageRequestSerializer(data={
+            'image': upload,
+            'alt_text': alt_text,
+            'type': image_type
+        })
+        if not serializer.is_valid():
+            return None, serializer.errors
+
+        data = dict(serializer.validated_data)
+        upload = data.pop('image')
+        image = ProductImage(product=product, **data)
+        try:
+            image.image.save(upload.name, upload, save=False)
+        except OSError as e:
+            logger.error(f'Error storing image {upload.name}: {str(e)}')
+            return None, {'image': [f'Could not store {upload.name}']}
+        return image, None
+
+    def delete_stored(self, images):
+        # Identical files may already back other images
+        for image in images:
+            release_image_file(image.image.name)
+
 
 class ProductVariantViewSet(viewsets.GenericViewSet,
                           CreateModelMixin,
@@ -235,20 +548,62 @@ class ProductVariantViewSet(viewsets.GenericViewSet,
     @transaction.atomic
     def perform_update(self, serializer):
         try:
-            old_obj = self.get_object()
+            # save() updates the instance in place, so read the old value first
+            old_quantity = serializer.instance.stock_quantity
             variant = serializer.save()
             
             # Log stock changes
-            if old_obj.stock_quantity != variant.stock_quantity:
+            if old_quantity != variant.stock_quantity:
                 logger.info(
                     f'Stock updated for variant {variant.sku}: '
-                    f'{old_obj.stock_quantity} -> {variant.stock_quantity}'
+                    f'{old_quantity} -> {variant.stock_quantity}'
                 )
             return variant
         except ValidationError as e:
             logger.error(f'Error updating variant: {str(e)}')
             raise DRFValidationError(detail=str(e))
 
+    @extend_schema(
+        description="Create or update variants by SKU; items with only sku and stock_quantity set stock",
+        request=ProductVariantBulkRequestSerializer,
+        responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT}
+    )
+    @action(detail=False, methods=['post'])
+    @transaction.atomic
+    def bulk(self, request):
+        """
+        Upsert many variants with set-based queries.
+        """
+        serializer = ProductVariantBulkRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        variants, errors = upsert_variants(
+            serializer.validated_data['variants'],
+            user=request.user,
+            note='Bulk stock update'
+        )
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f'Bulk upserted {len(variants)} variants')
+        return Response({
+            'count': len(variants),
+            'variants': [{'id': variant.pk, 'sku': variant.sku} for variant in variants],
+        })
+
+    @action(detail=True, methods=['get'], url_path='stock-history')
+    def stock_history(self, request, pk=None):
+        """
+        List stock changes of the variant, newest first.
+        """
+        variant = self.get_object()
+        queryset = StockHistory.objects.filter(variant=variant)
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = StockHistoryResponseSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     def perform_destroy(self, instance):
         """
         Soft delete the variant.